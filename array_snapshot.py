@@ -0,0 +1,52 @@
+import numpy as np
+from protocol import PLAYER, PLAYER_ID, ASTEROID
+
+# Snapshot states of an ArrayWorld. The player and asteroid sections are NumPy record arrays sorted by id and laid out
+# exactly like the protocol's PLAYER and ASTEROID entries, so protocol.encode writes each section with one tobytes()
+# and deltas are taken on whole id columns. Clients decode these snapshots like any other.
+
+PLAYER_RECORD = np.dtype([('id', '>u4'), ('x', '>f4'), ('y', '>f4'), ('angle', '>f4')])
+ASTEROID_RECORD = np.dtype([('id', '>u4'), ('x', '>f4'), ('y', '>f4'), ('angle', '>u2')])
+ENTITY_ID = np.dtype('>u4')
+assert PLAYER_RECORD.itemsize == PLAYER.size and ASTEROID_RECORD.itemsize == ASTEROID.size
+assert ENTITY_ID.itemsize == PLAYER_ID.size
+
+
+def empty_state():
+    return {'players': np.empty(0, PLAYER_RECORD), 'asteroids': np.empty(0, ASTEROID_RECORD), 'scores': {},
+            'time_left': 0.0, 'winner': 0}
+
+
+def find(sorted_ids, ids):
+    # Which ids are in sorted_ids, and where
+    if not len(sorted_ids):
+        return np.zeros(len(ids), bool), np.zeros(len(ids), np.int64)
+    index = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return sorted_ids[index] == ids, index
+
+
+def diff_states(base_state, state):
+    base_players, players = base_state['players'], state['players']
+    found, index = find(base_players['id'], players['id'])
+    unchanged = found.copy()
+    unchanged[found] = base_players[index[found]] == players[found]
+    removed_players = base_players['id'][~find(players['id'], base_players['id'])[0]]
+    base_scores = base_state['scores']
+    scores = {player_id: score for player_id, score in state['scores'].items() if base_scores.get(player_id) != score}
+    delta = {'players': players[~unchanged], 'removed_players': removed_players.astype(ENTITY_ID), 'scores': scores,
+             'time_left': state['time_left'], 'winner': state['winner']}
+
+    # Asteroids never change, they only appear and disappear; shared sections mean nothing did
+    base_asteroids, asteroids = base_state['asteroids'], state['asteroids']
+    if asteroids is base_asteroids:
+        delta['asteroids'], delta['removed_asteroids'] = asteroids[:0], np.empty(0, ENTITY_ID)
+    else:
+        delta['asteroids'] = asteroids[~find(base_asteroids['id'], asteroids['id'])[0]]
+        delta['removed_asteroids'] = base_asteroids['id'][~find(asteroids['id'], base_asteroids['id'])[0]].astype(ENTITY_ID)
+    return delta
+
+
+def snapshot_message(seq, base_seq, base_state, state):
+    message = diff_states(base_state, state)
+    message.update(type='snapshot', seq=seq, base=base_seq)
+    return message
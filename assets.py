@@ -0,0 +1,55 @@
+import pygame
+from collections import OrderedDict
+from settings import ASSET_CACHE_SIZE, ROTATION_STEPS
+from enums import Colour
+
+ASSET_DIR = "assets"
+ROTATION_STEP = 360 / ROTATION_STEPS
+
+_originals = {}  # Decoded images by file name, loaded once per process
+_surfaces = OrderedDict()  # (name, size, angle) -> surface, in least to most recently used order
+_preloaded = set()
+
+def quantize_angle(angle):
+    return round(angle / ROTATION_STEP) * ROTATION_STEP % 360
+
+def load_original(name):
+    image = _originals.get(name)
+    if image is None:
+        image = _originals[name] = pygame.image.load(f"{ASSET_DIR}/{name}").convert_alpha()
+    return image
+
+def get_image(name, size, angle=0):
+    angle = quantize_angle(angle)
+    key = (name, size, angle)
+    image = _surfaces.get(key)
+    if image is not None:
+        _surfaces.move_to_end(key)
+        return image
+
+    if not pygame.display.get_init():
+        # Fill a white square if pygame is not initialized
+        image = pygame.Surface(size)
+        image.fill(Colour.WHITE)
+    elif angle:
+        image = pygame.transform.rotate(get_image(name, size), angle)
+    else:
+        image = pygame.transform.scale(load_original(name), size)
+
+    _surfaces[key] = image
+    if len(_surfaces) > ASSET_CACHE_SIZE:
+        _surfaces.popitem(last=False)
+    return image
+
+def preload_rotations(name, size):
+    # Renders every rotation frame up front so turning never rotates a surface mid-game
+    if (name, size) in _preloaded:
+        return
+    for step in range(ROTATION_STEPS):
+        get_image(name, size, step * ROTATION_STEP)
+    _preloaded.add((name, size))
+
+def clear():
+    _originals.clear()
+    _surfaces.clear()
+    _preloaded.clear()
\ No newline at end of file
@@ -0,0 +1,46 @@
+import pygame
+import random
+from collections import OrderedDict
+from enums import Colour
+from settings import STAR_DENSITY, BACKGROUND_CHUNK_SIZE, BACKGROUND_CACHE_SIZE
+
+class Starfield:
+    # The star background is split into square chunks, each generated from the seed the first time it comes into view
+    def __init__(self, seed, chunk_size=BACKGROUND_CHUNK_SIZE, cache_size=BACKGROUND_CACHE_SIZE):
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.chunks = OrderedDict()  # (column, row) -> surface, in least to most recently used order
+
+    def create_chunk(self, column, row):
+        # Seeding from the chunk coordinates means an evicted chunk is regenerated identically
+        rng = random.Random(f"{self.seed}:{column}:{row}")
+        star_count = int(self.chunk_size * self.chunk_size * STAR_DENSITY)
+        chunk = pygame.Surface((self.chunk_size, self.chunk_size))
+        if pygame.display.get_surface():
+            chunk = chunk.convert()
+        chunk.fill(Colour.DARK_GREY)
+        for _ in range(star_count):
+            x, y = rng.randrange(self.chunk_size), rng.randrange(self.chunk_size)
+            pygame.draw.rect(chunk, Colour.WHITE, (x, y, 2, 2))
+        return chunk
+
+    def get_chunk(self, column, row):
+        key = (column, row)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = self.create_chunk(column, row)
+            if len(self.chunks) > self.cache_size:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(key)
+        return chunk
+
+    def draw(self, surface, camera_offset):
+        size = self.chunk_size
+        width, height = surface.get_size()
+        left, top = int(camera_offset.x // size), int(camera_offset.y // size)
+        right, bottom = int((camera_offset.x + width - 1) // size), int((camera_offset.y + height - 1) // size)
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                surface.blit(self.get_chunk(column, row), (column * size - camera_offset.x, row * size - camera_offset.y))
\ No newline at end of file
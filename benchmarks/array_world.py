@@ -0,0 +1,71 @@
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from entity_store import ArrayWorld
+from simulation import World, InputCommand
+from settings import FPS
+
+# Per-tick cost of the array-backed world against a fixed budget, with simulation.World as the reference
+
+def measure(world_class, players, asteroids, size, ticks, seed):
+    start = time.perf_counter()
+    world = world_class(size, size, seed=seed)
+    world.spawn_asteroids(asteroids)
+    rng = random.Random(seed)
+    for player_id in range(1, players + 1):
+        world.add_player(player_id, (rng.uniform(10, size - 10), rng.uniform(10, size - 10)))
+    world.to_state()  # The first full serialization happens once when the server starts
+    gc.freeze()  # As the server does once after building its first world
+    spawn = time.perf_counter() - start
+
+    commands = [{player_id: InputCommand(rng.choice([-1, 0, 1])) for player_id in range(1, players + 1)} for _ in range(16)]
+    step_times, state_times = [], []
+    pickups = 0
+    for tick in range(ticks):
+        start = time.perf_counter()
+        pickups += len(world.step(1 / FPS, commands[tick % len(commands)]))
+        middle = time.perf_counter()
+        world.to_state()
+        step_times.append(middle - start)
+        state_times.append(time.perf_counter() - middle)
+
+    step_times.sort()
+    state_times.sort()
+    totals = sorted(step + state for step, state in zip(step_times, state_times))
+    return {
+        'spawn_ms': spawn * 1000,
+        'step_ms': step_times[len(step_times) // 2] * 1000,
+        'state_ms': state_times[len(state_times) // 2] * 1000,
+        'p99_ms': totals[int(len(totals) * 0.99)] * 1000,
+        'pickups': pickups,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Array-backed world tick cost")
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--asteroids', type=int, default=100000)
+    parser.add_argument('--size', type=int, default=24000, help='World width and height')
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--budget-ms', type=float, default=1000 / FPS, help='Exit non-zero if the p99 tick exceeds this')
+    parser.add_argument('--reference', action='store_true', help='Also run simulation.World for comparison, slow at this scale')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    worlds = [('ArrayWorld', ArrayWorld)] + ([('World', World)] if args.reference else [])
+    print(f"{args.players} players, {args.asteroids} asteroids, {args.size}x{args.size} world, budget {args.budget_ms:.2f} ms")
+    print(f"{'world':<12}{'spawn ms':>10}{'step ms':>10}{'state ms':>10}{'p99 ms':>10}{'pickups':>9}")
+    failed = False
+    for name, world_class in worlds:
+        result = measure(world_class, args.players, args.asteroids, args.size, args.ticks, args.seed)
+        print(f"{name:<12}{result['spawn_ms']:>10.1f}{result['step_ms']:>10.2f}{result['state_ms']:>10.2f}"
+              f"{result['p99_ms']:>10.2f}{result['pickups']:>9}")
+        failed |= world_class is ArrayWorld and result['p99_ms'] > args.budget_ms
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
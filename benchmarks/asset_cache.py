@@ -0,0 +1,64 @@
+import argparse
+import time
+
+from common import headless
+headless()
+
+import pygame
+import assets
+from settings import WIDTH, HEIGHT, PLAYER_HEIGHT, PLAYER_WIDTH, ASTEROID_HEIGHT, ASTEROID_WIDTH, ASTEROID_COUNT
+
+# Sprite creation and per-frame rotation cost, loading from disk per instance (the old behaviour) vs. the shared asset cache
+
+def uncached_asteroid(angle):
+    image = pygame.image.load("assets/asteroid.png").convert_alpha()
+    image = pygame.transform.scale(image, (ASTEROID_HEIGHT, ASTEROID_WIDTH))
+    return pygame.transform.rotate(image, angle)
+
+def uncached_rocket():
+    image = pygame.image.load("assets/player_rocket.png").convert_alpha()
+    return pygame.transform.scale(image, (PLAYER_HEIGHT, PLAYER_WIDTH))
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        function(i)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Asset loading and rotation cost, uncached vs. cached")
+    parser.add_argument('--asteroids', type=int, default=ASTEROID_COUNT, help='Asteroids created for the startup measurement')
+    parser.add_argument('--frames', type=int, default=10000, help='Rocket rotations measured')
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    rocket_size = (PLAYER_HEIGHT, PLAYER_WIDTH)
+    asteroid_size = (ASTEROID_HEIGHT, ASTEROID_WIDTH)
+
+    start = time.perf_counter()
+    rocket = uncached_rocket()
+    for i in range(args.asteroids):
+        uncached_asteroid(i % 4 * 90)
+    uncached_startup = (time.perf_counter() - start) * 1000
+
+    assets.clear()
+    start = time.perf_counter()
+    assets.preload_rotations("player_rocket.png", rocket_size)
+    for i in range(args.asteroids):
+        assets.get_image("asteroid.png", asteroid_size, i % 4 * 90)
+    cached_startup = (time.perf_counter() - start) * 1000
+
+    uncached_rotate = timed(lambda i: pygame.transform.rotate(rocket, i * 1.7 % 360), args.frames)
+    cached_rotate = timed(lambda i: assets.get_image("player_rocket.png", rocket_size, i * 1.7 % 360), args.frames)
+    uncached_create = timed(lambda i: uncached_asteroid(i % 4 * 90), min(args.frames, 2000))
+    cached_create = timed(lambda i: assets.get_image("asteroid.png", asteroid_size, i % 4 * 90), args.frames)
+
+    print(f"{'measurement':<36}{'uncached':>12}{'cached':>12}")
+    print(f"{f'startup, rocket + {args.asteroids} asteroids (ms)':<36}{uncached_startup:>12.2f}{cached_startup:>12.2f}")
+    print(f"{'rocket rotation per frame (us)':<36}{uncached_rotate:>12.2f}{cached_rotate:>12.2f}")
+    print(f"{'asteroid image per sprite (us)':<36}{uncached_create:>12.2f}{cached_create:>12.2f}")
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import contextlib
+import io
+import socket
+import subprocess
+import sys
+import threading
+import time
+import heapq
+
+from common import SERVER_SCRIPT, headless, wait_for_port
+headless()
+
+import pygame
+from settings import WIDTH, HEIGHT, FPS
+from enums import GameState
+
+# Runs the multiplayer client loop from main.py headlessly behind a proxy that delays every byte
+# by a fixed latency in each direction, and reports the frame rate the client holds
+
+class LatencyProxy:
+    def __init__(self, target_port, latency):
+        self.target_port = target_port
+        self.latency = latency
+        self.listener = socket.create_server(('localhost', 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+
+    def accept_loop(self):
+        while True:
+            client, _ = self.listener.accept()
+            upstream = socket.create_connection(('localhost', self.target_port))
+            for source, destination in ((client, upstream), (upstream, client)):
+                pending = []
+                condition = threading.Condition()
+                threading.Thread(target=self.read_loop, args=(source, pending, condition), daemon=True).start()
+                threading.Thread(target=self.write_loop, args=(destination, pending, condition), daemon=True).start()
+
+    def read_loop(self, source, pending, condition):
+        sequence = 0
+        with contextlib.suppress(OSError):
+            while data := source.recv(65536):
+                with condition:
+                    heapq.heappush(pending, (time.perf_counter() + self.latency, sequence, data))
+                    sequence += 1
+                    condition.notify()
+
+    def write_loop(self, destination, pending, condition):
+        while True:
+            with condition:
+                while not pending:
+                    condition.wait()
+                due, _, data = pending[0]
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    condition.wait(delay)
+                    continue
+                heapq.heappop(pending)
+            try:
+                destination.sendall(data)
+            except OSError:
+                return
+
+def measure(server_port, latency, duration):
+    from game import Game
+
+    proxy = LatencyProxy(server_port, latency)
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    clock = pygame.time.Clock()
+    game = Game(window)
+    with contextlib.redirect_stdout(io.StringIO()):
+        game.start_multiplayer('localhost', proxy.port)
+    if game.game_state != GameState.PLAYING:
+        raise RuntimeError("Could not join the server through the proxy")
+
+    frame_times = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        while time.perf_counter() - start < duration:
+            frame_start = time.perf_counter()
+            dt = clock.tick(FPS) / 1000
+            pygame.event.pump()
+            game.update(dt)
+            game.draw()
+            pygame.display.flip()
+            frame_times.append(time.perf_counter() - frame_start)
+        game.stop_multiplayer()
+
+    frame_times.sort()
+    return {
+        'latency_ms': latency * 1000,
+        'fps': len(frame_times) / duration,
+        'p50_ms': frame_times[len(frame_times) // 2] * 1000,
+        'p99_ms': frame_times[int(len(frame_times) * 0.99)] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Client frame rate under injected network latency")
+    parser.add_argument('--latency-ms', type=float, nargs='+', default=[0, 100, 250])
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds measured per latency')
+    parser.add_argument('--port', type=int, default=5601)
+    parser.add_argument('--min-fps', type=float, default=FPS * 0.95, help='Exit non-zero if any run falls below this')
+    args = parser.parse_args()
+
+    server = subprocess.Popen([sys.executable, SERVER_SCRIPT, '--port', str(args.port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(args.port)
+        pygame.init()
+        failed = False
+        print(f"{'latency ms':>11}{'fps':>8}{'p50 ms':>9}{'p99 ms':>9}")
+        for latency_ms in args.latency_ms:
+            result = measure(args.port, latency_ms / 1000, args.duration)
+            print(f"{result['latency_ms']:>11.0f}{result['fps']:>8.1f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}")
+            failed |= result['fps'] < args.min_fps
+        pygame.quit()
+    finally:
+        server.terminate()
+        server.wait()
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
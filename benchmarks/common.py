@@ -0,0 +1,32 @@
+import os
+import socket
+import sys
+import time
+
+# Shared by the benchmarks, which import it before any project module: it puts the project root on the path.
+# Benchmarks that draw call headless() before importing pygame.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_SCRIPT = os.path.join(ROOT, 'server', 'server.py')
+sys.path.append(ROOT)
+
+def headless():
+    os.chdir(ROOT)  # Assets are loaded relative to the project root
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
+
+def wait_for_port(port, host='localhost', process=None, timeout=10, interval=0.1):
+    # Returns once the port accepts connections, fails early if the process that should open it has exited
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            return
+        except OSError:
+            if (process is not None and process.poll() is not None) or time.perf_counter() > deadline:
+                raise RuntimeError(f"Server did not start on port {port}")
+            time.sleep(interval)
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
@@ -0,0 +1,81 @@
+import argparse
+import hashlib
+import random
+import sys
+import time
+
+from common import headless
+headless()
+
+import pygame
+from settings import WIDTH, HEIGHT, SIMULATION_STEP
+from enums import GameState
+from simulation import InputCommand
+
+# Plays the same scripted single player session at several frame rates, with simulated frame times so it runs as fast
+# as possible, and checks that the fixed-step simulation ends in the same state with the same number of steps
+
+def scripted_input(step):
+    return InputCommand(rotate=(step // 45) % 3 - 1)  # Left, straight, right, in 45 step stretches
+
+def measure(fps, seconds, seed, jitter):
+    from game import Game
+
+    class ScriptedGame(Game):
+        def read_input(self):
+            return scripted_input(round(self.world.time / SIMULATION_STEP))
+
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    game = ScriptedGame(window)
+    game.reset_game(seed=seed)
+    game.game_state = GameState.PLAYING
+
+    rng = random.Random(seed)
+    steps = round(seconds / SIMULATION_STEP)
+    frames = 0
+    update_time = draw_time = 0.0
+    while round(game.world.time / SIMULATION_STEP) < steps and game.game_state == GameState.PLAYING:
+        dt = 1 / fps * (1 + rng.uniform(-jitter, jitter))
+        remaining = steps - round(game.world.time / SIMULATION_STEP)
+        dt = min(dt, (remaining + 0.5) * SIMULATION_STEP - game.accumulator)  # Never run past the last step
+        start = time.perf_counter()
+        game.update(dt)
+        middle = time.perf_counter()
+        game.draw()
+        update_time += middle - start
+        draw_time += time.perf_counter() - middle
+        frames += 1
+
+    player = game.world.players[game.player_id]
+    state = (round(player.x, 6), round(player.y, 6), round(player.angle, 6), game.score, sorted(game.world.asteroids))
+    return {
+        'fps': fps,
+        'frames': frames,
+        'steps': round(game.world.time / SIMULATION_STEP),
+        'score': game.score,
+        'update_ms': update_time / frames * 1000,
+        'draw_ms': draw_time / frames * 1000,
+        'state': hashlib.sha1(repr(state).encode()).hexdigest()[:12],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation determinism and cost across frame rates")
+    parser.add_argument('--fps', type=float, nargs='+', default=[30, 60, 120, 240])
+    parser.add_argument('--seconds', type=float, default=20.0, help='Game seconds played at each frame rate')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Random variation of each frame time, as a fraction')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    pygame.init()
+    print(f"{'fps':>6}{'frames':>8}{'steps':>7}{'score':>7}{'update ms':>11}{'draw ms':>9}  state")
+    results = [measure(fps, args.seconds, args.seed, args.jitter) for fps in args.fps]
+    for result in results:
+        print(f"{result['fps']:>6.0f}{result['frames']:>8}{result['steps']:>7}{result['score']:>7}"
+              f"{result['update_ms']:>11.3f}{result['draw_ms']:>9.3f}  {result['state']}")
+    pygame.quit()
+
+    # Every frame rate has to end in exactly the same simulation state
+    sys.exit(0 if len({(result['steps'], result['state']) for result in results}) == 1 else 1)
+
+if __name__ == "__main__":
+    main()
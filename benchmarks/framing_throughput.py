@@ -0,0 +1,73 @@
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from protocol import FrameDecoder, encode, snapshot_message, empty_state
+
+# Loopback throughput of the framed transport: snapshots of growing size are streamed over TCP
+# and reassembled with FrameDecoder, once framing only and once with full decoding
+
+def make_frame(asteroid_count):
+    state = {
+        'players': {player_id: {'pos': (100.0, 200.0), 'angle': 45.0} for player_id in range(1, 5)},
+        'asteroids': {asteroid_id: {'pos': (float(asteroid_id), 10.0), 'angle': 90} for asteroid_id in range(1, asteroid_count + 1)},
+        'scores': {player_id: 0 for player_id in range(1, 5)},
+        'time_left': 30.0,
+        'winner': 0,
+    }
+    return encode(snapshot_message(1, 0, empty_state(), state))
+
+def run(frame, total_bytes, decode_messages):
+    listener = socket.create_server(('localhost', 0))
+    port = listener.getsockname()[1]
+    count = max(1, total_bytes // len(frame))
+    batch = frame * max(1, 65536 // len(frame))
+    frames_per_batch = len(batch) // len(frame)
+
+    def sender():
+        client = socket.create_connection(('localhost', port))
+        sent = 0
+        while sent < count:
+            client.sendall(batch)
+            sent += frames_per_batch
+        client.close()
+
+    thread = threading.Thread(target=sender)
+    thread.start()
+    connection, _ = listener.accept()
+    decoder = FrameDecoder()
+    received = 0
+    start = time.perf_counter()
+    while decoder.recv_into(connection):
+        if decode_messages:
+            for _ in decoder.messages():
+                received += 1
+        else:
+            while decoder.next_frame() is not None:
+                received += 1
+    elapsed = time.perf_counter() - start
+    thread.join()
+    connection.close()
+    listener.close()
+    return received, received * len(frame) / elapsed / 1e6, received / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Framed transport loopback throughput")
+    parser.add_argument('--asteroids', type=int, nargs='+', default=[0, 10, 100, 1000, 10000],
+                        help='Asteroids per snapshot, sets the payload size')
+    parser.add_argument('--megabytes', type=int, default=64, help='Data streamed per measurement')
+    args = parser.parse_args()
+
+    print(f"{'payload B':>10}{'frames':>10}{'frame MB/s':>12}{'frame msg/s':>13}{'decode MB/s':>13}{'decode msg/s':>14}")
+    for asteroid_count in args.asteroids:
+        frame = make_frame(asteroid_count)
+        frames, frame_mbps, frame_rate = run(frame, args.megabytes * 1024 * 1024, False)
+        _, decode_mbps, decode_rate = run(frame, args.megabytes * 1024 * 1024 // 8, True)
+        print(f"{len(frame):>10}{frames:>10}{frame_mbps:>12.1f}{frame_rate:>13.0f}{decode_mbps:>13.1f}{decode_rate:>14.0f}")
+
+if __name__ == "__main__":
+    main()
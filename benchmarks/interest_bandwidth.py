@@ -0,0 +1,80 @@
+import argparse
+import gc
+import os
+import random
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root)
+sys.path.append(os.path.join(root, 'server'))
+from entity_store import ArrayWorld
+from interest import ClientView
+from protocol import encode, SnapshotHistory
+from array_snapshot import empty_state, snapshot_message
+from simulation import InputCommand
+from config import Config
+from settings import FPS, ASTEROID_DENSITY, WIDTH, HEIGHT
+
+# Bytes each client receives per tick as the world grows, full-world snapshots against area-of-interest snapshots.
+# Player count grows with the world so player density stays the same, every client acks each snapshot straight away.
+
+def measure(size, players, ticks, seed):
+    world = ArrayWorld(size, size, seed=seed)
+    world.spawn_asteroids(int(size * size * ASTEROID_DENSITY))
+    rng = random.Random(seed)
+    for player_id in range(1, players + 1):
+        world.add_player(player_id, (rng.uniform(10, size - 10), rng.uniform(10, size - 10)))
+    world.to_state()
+    gc.freeze()
+
+    config = Config(environ={})  # Defaults, whatever the environment says
+    views = {player_id: ClientView(player_id, config) for player_id in range(1, players + 1)}
+    full_history = SnapshotHistory(empty=empty_state)
+    full_bytes = interest_bytes = 0
+    join_full = join_interest = 0
+    for seq in range(1, ticks + 1):
+        world.step(1 / FPS, {player_id: InputCommand(rng.choice([-1, 0, 1])) for player_id in views})
+        state = world.to_state()
+        state['time_left'], state['winner'] = 0.0, 0
+        world.index_players()
+
+        # Everyone shares the full state, so one encoding per tick serves every client
+        base_seq = seq - 1
+        full = len(encode(snapshot_message(seq, base_seq, full_history.get(base_seq), state)))
+        full_history.add(seq, state)
+        interest = 0
+        for view in views.values():
+            interest += len(view.snapshot(world, state, seq, base_seq))
+        if seq == 1:
+            join_full, join_interest = full, interest / players  # First snapshot is a full one against seq 0
+        else:
+            full_bytes += full
+            interest_bytes += interest / players
+
+    return {
+        'asteroids': len(world.asteroids) + sum(world.scores.values()),
+        'join_full': join_full,
+        'join_interest': join_interest,
+        'full': full_bytes / (ticks - 1),
+        'interest': interest_bytes / (ticks - 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-client snapshot bandwidth vs. world size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='World size as multiples of the view')
+    parser.add_argument('--players-per-view', type=float, default=0.5, help='Players per view-sized area of the world')
+    parser.add_argument('--ticks', type=int, default=120)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"Bytes per client per tick over {args.ticks} ticks, {args.players_per_view} players per {WIDTH}x{HEIGHT} view")
+    print(f"{'world':>12}{'players':>9}{'asteroids':>11}{'join full':>11}{'join AOI':>10}{'full/tick':>11}{'AOI/tick':>10}")
+    for multiple in args.sizes:
+        size = WIDTH * multiple
+        players = max(1, round(multiple * multiple * args.players_per_view))
+        result = measure(size, players, args.ticks, args.seed)
+        print(f"{f'{size}x{size}':>12}{players:>9}{result['asteroids']:>11}{result['join_full']:>11}"
+              f"{result['join_interest']:>10.0f}{result['full']:>11.0f}{result['interest']:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import random
+import selectors
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import SERVER_SCRIPT, wait_for_port, percentile
+from protocol import FrameDecoder, SnapshotHistory, ProtocolError, encode
+from simulation import PlayerState, InputCommand, move_player
+from settings import FPS, CONFIG_POLL_INTERVAL
+from config import Config, ConfigError, FIELDS, SERVER, convert
+
+WIRE_POSITION = struct.Struct('!ff')
+
+# Load generator for the multiplayer server: N scripted bots in one process, each flying like a client player would
+# and sending a move every frame. Latency is measured from sending a move to receiving the first snapshot that has
+# the bot at that position, so it includes the wait for the next server tick. With --sweep the server's config file
+# is rewritten between runs, so one server process is measured at every value of a tuning knob it reloads.
+
+class Bot:
+    def __init__(self, host, port, rng):
+        self.socket = socket.create_connection((host, port))
+        self.socket.setblocking(False)
+        self.decoder = FrameDecoder()
+        self.snapshots = SnapshotHistory()
+        self.rng = rng
+        self.player_id = None
+        self.rules = None  # The server's shared config, from the welcome message
+        self.player = None  # Created from the first snapshot, the server picks the spawn point
+        self.command = InputCommand()
+        self.sent = {}  # Wire position -> send time, for moves not yet seen in a snapshot, oldest first
+        self.outgoing = bytearray()  # Encoded moves the socket has not taken yet, frames must never be cut short
+        self.bytes = 0
+        self.latencies = []
+        self.connected = True
+
+    def receive(self, now):
+        # Returns the number of snapshots received
+        count = self.decoder.recv_into(self.socket)
+        if not count:
+            raise ConnectionError("Connection closed by server")
+        self.bytes += count
+        snapshots = 0
+        for message in self.decoder.messages():
+            if message['type'] == 'welcome':
+                self.player_id = message['player_id']
+                self.rules = Config(overrides=message['config'], environ={})
+                continue
+            snapshots += 1
+            state = self.snapshots.apply(message)
+            if state is None or self.player_id not in state['players']:
+                continue
+            data = state['players'][self.player_id]
+            if self.player is None:
+                self.player = PlayerState(self.player_id, data['pos'][0], data['pos'][1], data['angle'])
+            sent = self.sent.get(data['pos'])
+            if sent is not None:
+                # The snapshot covers this move and every older one still pending, the wait counts from the oldest
+                self.latencies.append(now - next(iter(self.sent.values())))
+                self.sent = {pos: sent_at for pos, sent_at in self.sent.items() if sent_at > sent}
+        return snapshots
+
+    def send_move(self, now, dt):
+        # Returns whether a move was sent
+        if self.player is None or self.flush():
+            return False  # Still backed up, this move is dropped like a late frame would be
+        if self.rng.random() < 0.05:
+            self.command = InputCommand(self.rng.choice([-1, 0, 1]))
+        rules = self.rules
+        move_player(self.player, self.command, dt, rules.game_width, rules.game_height, rules.player_speed, rules.player_rotate_speed)
+        pos = WIRE_POSITION.unpack(WIRE_POSITION.pack(self.player.x, self.player.y))  # As the server will store it
+        self.outgoing += encode({'type': 'move', 'ack': self.snapshots.latest, 'pos': pos, 'angle': self.player.angle})
+        self.sent[pos] = now
+        self.flush()
+        return True
+
+    def flush(self):
+        # Sends what the socket takes, True while some of it is still waiting for the socket to become writable
+        if self.outgoing:
+            try:
+                del self.outgoing[:self.socket.send(self.outgoing)]
+            except BlockingIOError:
+                pass
+        return bool(self.outgoing)
+
+    def events(self):
+        return selectors.EVENT_READ | selectors.EVENT_WRITE if self.outgoing else selectors.EVENT_READ
+
+    def close(self):
+        self.connected = False
+        self.socket.close()
+
+def set_server_config(path, name, value):
+    # Rewrites one field of the server's config file, it is picked up within CONFIG_POLL_INTERVAL
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    data[name] = value
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+def parse_sweep(parser, sweep):
+    # NAME=V1,V2,... of a tuning knob the server reloads
+    name, _, values = sweep.partition('=')
+    if name not in FIELDS or FIELDS[name][2] != SERVER or not FIELDS[name][3]:
+        parser.error(f"--sweep needs a server field that can be reloaded, got {name!r}")
+    try:
+        return name, [convert(name, value) for value in values.split(',')]
+    except ConfigError as e:
+        parser.error(str(e))
+
+def run(host, port, bot_count, duration, send_rate, connect_rate, seed):
+    rng = random.Random(seed)
+    selector = selectors.DefaultSelector()
+    bots = []
+    disconnects = 0
+    snapshots = 0
+    moves = 0
+    next_connect = next_send = start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        now = time.perf_counter()
+        # Bots join gradually so the server sees a ramp rather than one burst
+        while len(bots) < bot_count and now >= next_connect:
+            try:
+                bot = Bot(host, port, random.Random(rng.getrandbits(32)))
+            except OSError as e:
+                print(f"Connect failed: {e}")
+                disconnects += 1
+                bot_count -= 1
+                continue
+            bots.append(bot)
+            selector.register(bot.socket, selectors.EVENT_READ, bot)
+            next_connect += 1 / connect_rate
+
+        for key, mask in selector.select(timeout=0.002):
+            bot = key.data
+            try:
+                if mask & selectors.EVENT_WRITE:
+                    bot.flush()
+                if mask & selectors.EVENT_READ:
+                    snapshots += bot.receive(time.perf_counter())
+            except BlockingIOError:
+                pass
+            except (OSError, ProtocolError) as e:
+                print(f"Bot {bot.player_id} disconnected: {e}")
+                selector.unregister(bot.socket)
+                bot.close()
+                disconnects += 1
+                continue
+            if key.events != bot.events():
+                selector.modify(bot.socket, bot.events(), bot)
+
+        if now >= next_send:
+            next_send += 1 / send_rate
+            for bot in bots:
+                if not bot.connected:
+                    continue
+                try:
+                    moves += bot.send_move(now, 1 / send_rate)
+                except OSError as e:
+                    print(f"Bot {bot.player_id} disconnected: {e}")
+                    selector.unregister(bot.socket)
+                    bot.close()
+                    disconnects += 1
+                    continue
+                if bot.outgoing:
+                    selector.modify(bot.socket, bot.events(), bot)
+    elapsed = time.perf_counter() - start
+
+    for bot in bots:
+        if bot.connected:
+            bot.close()
+    latencies = sorted(latency for bot in bots for latency in bot.latencies)
+    return {
+        'bots': len(bots),
+        'snapshots_per_sec': snapshots / elapsed,
+        'moves_per_sec': moves / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'kb_per_client': sum(bot.bytes for bot in bots) / max(1, len(bots)) / 1024,
+        'kbps_per_client': sum(bot.bytes for bot in bots) / max(1, len(bots)) / elapsed / 1024,
+        'disconnects': disconnects,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot load generator for the multiplayer server")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--bots', type=int, nargs='+', default=[50], help='Bot counts to run, one run each')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run, including the connect ramp')
+    parser.add_argument('--send-rate', type=float, default=FPS, help='Moves per second per bot, the client sends one per frame')
+    parser.add_argument('--connect-rate', type=float, default=100.0, help='New bots per second')
+    parser.add_argument('--spawn', choices=['threaded', 'async', 'sharded'], help='Start a local server in this mode for each run')
+    parser.add_argument('--max-p99-ms', type=float, help='Exit non-zero if p99 latency exceeds this')
+    parser.add_argument('--max-disconnects', type=int, help='Exit non-zero if more bots than this disconnect')
+    parser.add_argument('--sweep', metavar='NAME=V1,V2', help='Run every bot count at each value of a server tuning knob, e.g. tick_rate=20,30,60')
+    parser.add_argument('--server-config', metavar='PATH', help='Config file the server was started with, rewritten by --sweep')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    sweep_name, sweep_values = parse_sweep(parser, args.sweep) if args.sweep else (None, [None])
+    if args.sweep and not args.spawn and not args.server_config:
+        parser.error("--sweep needs --server-config, or --spawn to start a server with its own")
+    directory = tempfile.TemporaryDirectory() if args.spawn and not args.server_config else None
+    config_path = os.path.join(directory.name, 'server.json') if directory else args.server_config
+    original = None
+    if config_path and os.path.exists(config_path):
+        with open(config_path) as f:
+            original = f.read()  # Put back once the sweep is done
+
+    print(f"{sweep_name:>16}" if sweep_name else '', end='')
+    print(f"{'bots':>6}{'snaps/s':>10}{'moves/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'KB/client':>11}{'KB/s/client':>13}{'disconn':>9}")
+    failed = False
+    try:
+        for bot_count in args.bots:
+            server = None
+            if args.spawn:
+                command = [sys.executable, SERVER_SCRIPT, '--mode', args.spawn, '--host', args.host, '--port', str(args.port)]
+                if sweep_name:
+                    set_server_config(config_path, sweep_name, sweep_values[0])
+                    command += ['--config', config_path]
+                server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_for_port(args.port, args.host, server)
+                for value in sweep_values:
+                    if sweep_name:
+                        set_server_config(config_path, sweep_name, value)
+                        time.sleep(CONFIG_POLL_INTERVAL * 2)  # Every server process has reloaded it by now
+                        print(f"{value:>16}", end='')
+                    result = run(args.host, args.port, bot_count, args.duration, args.send_rate, args.connect_rate, args.seed)
+                    print(f"{result['bots']:>6}{result['snapshots_per_sec']:>10.0f}{result['moves_per_sec']:>10.0f}{result['p50_ms']:>9.1f}"
+                          f"{result['p99_ms']:>9.1f}{result['kb_per_client']:>11.1f}{result['kbps_per_client']:>13.2f}{result['disconnects']:>9}")
+                    failed |= args.max_p99_ms is not None and result['p99_ms'] > args.max_p99_ms
+                    failed |= args.max_disconnects is not None and result['disconnects'] > args.max_disconnects
+            finally:
+                if server:
+                    server.terminate()
+                    server.wait()
+    finally:
+        if sweep_name and original is not None:
+            with open(config_path, 'w') as f:
+                f.write(original)
+        if directory:
+            directory.cleanup()
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
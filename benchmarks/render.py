@@ -0,0 +1,172 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from common import headless, percentile
+headless()
+
+import settings
+from config import Config
+
+# Headless rendering benchmark. Each world configuration (game_size_multiplier, asteroid_density, player count) runs
+# in its own process, so that peak memory is per configuration. The local player flies a scripted course while the
+# other players fly randomly and are drawn as remote players. Results can be written as JSON and a later run compared
+# against them, failing on regressions.
+
+COMPARED = ('update_p50_ms', 'draw_p50_ms', 'draw_p99_ms', 'background_cold_ms', 'peak_rss_mb')
+NOISE_FLOOR = {'update_p50_ms': 0.05, 'draw_p50_ms': 0.05, 'draw_p99_ms': 1.0, 'background_cold_ms': 0.2, 'peak_rss_mb': 2.0}
+
+def time_calls(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+def measure(multiplier, density, players, frames, warmup, seed):
+    config = Config(overrides={'game_size_multiplier': multiplier, 'asteroid_density': density}, environ={})
+    import pygame
+    from game import Game
+    from enums import GameState
+    from profiler import FrameProfiler
+    from simulation import InputCommand
+
+    class BenchGame(Game):
+        def read_input(self):
+            return InputCommand(random.Random(int(self.world.time * 2)).choice([-1, 0, 0, 1]))  # Holds a turn for half a second
+
+    pygame.init()
+    window = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT))
+    rng = random.Random(seed)
+    profiler = FrameProfiler()
+    game = BenchGame(window, profiler=profiler, seed=seed, config=config)
+    game.reset_game()
+    game.game_state = GameState.PLAYING
+    bots = range(2, players + 1)
+    for bot_id in bots:
+        game.world.add_player(bot_id, (rng.uniform(10, config.game_width - 10), rng.uniform(10, config.game_height - 10)))
+    commands = {bot_id: InputCommand() for bot_id in bots}
+
+    # Chunks generated for one full view, from a fresh background as after startup
+    background_cold = time_calls(lambda: game.create_background().draw(window, game.camera_offset), 5)
+
+    dt = 1 / config.fps
+    update_times, draw_times, visible = [], [], []
+    for frame in range(warmup + frames):
+        start = time.perf_counter()
+        game.update(dt)
+        for bot_id in bots:
+            if rng.random() < 0.05:
+                commands[bot_id] = InputCommand(rng.choice([-1, 0, 1]))
+        for _, asteroid_id in game.world.step(dt, commands):
+            game.remove_asteroid(asteroid_id)
+        # Bots go through the same sprite and trail updates as remote players; the asteroid field is left alone
+        states = {player_id: player.serialize() for player_id, player in game.world.players.items()}
+        game.update_multiplayer({'players': states, 'asteroids': game.asteroid_state,
+                                 'scores': game.world.scores, 'time_left': config.time_limit, 'winner': 0})
+        game.game_state = GameState.PLAYING  # Winning or running out of time would end the run early
+        middle = time.perf_counter()
+        game.draw()
+        pygame.display.flip()
+        end = time.perf_counter()
+        if frame >= warmup:
+            update_times.append(middle - start)
+            draw_times.append(end - middle)
+            visible.append(profiler.counters.get('sprites drawn', 0))
+
+    # Cost of a single sprite draw, with the caches as warm as they are mid-game
+    player_draw = time_calls(lambda: game.player.draw(window, game.camera_offset), 1000)
+    remote = next(iter(game.remote_players.values()), None)
+    remote_draw = time_calls(lambda: remote.draw(window, game.camera_offset), 1000) if remote else 0.0
+    asteroid = next(iter(game.asteroids.values()), None)
+    asteroid_draw = time_calls(lambda: asteroid.draw(window, game.camera_offset), 1000) if asteroid else 0.0
+    pygame.quit()
+
+    return {
+        'multiplier': multiplier,
+        'density': density,
+        'players': players,
+        'asteroids': config.asteroid_count,
+        'frames': frames,
+        'visible_sprites': sum(visible) / len(visible),
+        'update_p50_ms': percentile(update_times, 0.5) * 1000,
+        'update_p99_ms': percentile(update_times, 0.99) * 1000,
+        'draw_p50_ms': percentile(draw_times, 0.5) * 1000,
+        'draw_p99_ms': percentile(draw_times, 0.99) * 1000,
+        'draw_max_ms': max(draw_times) * 1000,
+        'background_cold_ms': background_cold * 1000,
+        'player_draw_us': player_draw * 1e6,
+        'remote_draw_us': remote_draw * 1e6,
+        'asteroid_draw_us': asteroid_draw * 1e6,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+def run_isolated(config):
+    # A fresh interpreter per configuration, so peak memory and the caches start from nothing
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', json.dumps(config)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+def key(result):
+    return f"x{result['multiplier']} density {result['density']} players {result['players']}"
+
+def compare(results, baseline, tolerance):
+    # Returns a line per regressed metric, one that got worse by more than the tolerance plus its noise floor
+    baseline = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        base = baseline.get(key(result))
+        if base is None:
+            continue
+        for metric in COMPARED:
+            if result[metric] > base[metric] * (1 + tolerance) + NOISE_FLOOR[metric]:
+                regressions.append(f"{key(result)}: {metric} {base[metric]:.3f} -> {result[metric]:.3f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless update/draw times and peak memory by world size and entity count")
+    parser.add_argument('--multipliers', type=int, nargs='+', default=[settings.GAME_SIZE_MULTIPLIER, 8], help='game_size_multiplier values')
+    parser.add_argument('--densities', type=float, nargs='+', default=[settings.ASTEROID_DENSITY, 0.0001], help='asteroid_density values')
+    parser.add_argument('--players', type=int, nargs='+', default=[1, 20, 100], help='Player counts, including the local player')
+    parser.add_argument('--frames', type=int, default=600, help='Measured frames per configuration')
+    parser.add_argument('--warmup', type=int, default=60, help='Frames run before measuring')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', metavar='PATH', help='Write the results as JSON, to use as a baseline later')
+    parser.add_argument('--baseline', metavar='PATH', help='Exit non-zero if any configuration regressed against this')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown or growth against the baseline, as a fraction')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        config = json.loads(args.worker)
+        print(json.dumps(measure(**config)))
+        return
+
+    print(f"{'mult':>5}{'density':>9}{'players':>8}{'asteroids':>10}{'visible':>8}{'update p50':>11}{'p99':>7}"
+          f"{'draw p50':>9}{'p99':>7}{'bg cold':>8}{'player us':>10}{'remote us':>10}{'ast us':>7}{'peak MB':>8}")
+    results = []
+    for multiplier, density, players in itertools.product(args.multipliers, args.densities, args.players):
+        result = run_isolated({'multiplier': multiplier, 'density': density, 'players': players,
+                               'frames': args.frames, 'warmup': args.warmup, 'seed': args.seed})
+        results.append(result)
+        print(f"{multiplier:>5}{density:>9.5f}{players:>8}{result['asteroids']:>10}{result['visible_sprites']:>8.0f}"
+              f"{result['update_p50_ms']:>11.3f}{result['update_p99_ms']:>7.2f}{result['draw_p50_ms']:>9.3f}{result['draw_p99_ms']:>7.2f}"
+              f"{result['background_cold_ms']:>8.2f}{result['player_draw_us']:>10.1f}{result['remote_draw_us']:>10.1f}{result['asteroid_draw_us']:>7.1f}{result['peak_rss_mb']:>8.1f}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}")
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
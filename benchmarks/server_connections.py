@@ -0,0 +1,130 @@
+import argparse
+import os
+import selectors
+import socket
+import subprocess
+import sys
+import time
+
+from common import SERVER_SCRIPT, wait_for_port
+from protocol import FrameDecoder, encode
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+# Compares the server modes: server CPU and memory against the number of connected clients.
+# Child processes are included, so sharded mode counts its workers as well as the front door.
+
+def process_tree(pid):
+    pids = [pid]
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as f:
+            for child in f.read().split():
+                pids.extend(process_tree(int(child)))
+    return pids
+
+def process_cpu_seconds(pid):
+    total = 0
+    for tree_pid in process_tree(pid):
+        with open(f'/proc/{tree_pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        total += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+    return total
+
+def process_rss_kb(pid):
+    total = 0
+    for tree_pid in process_tree(pid):
+        with open(f'/proc/{tree_pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+    return total
+
+def flush(client, outgoing):
+    # Sends what the socket takes, frames must never be cut short. True while some of it is still waiting.
+    try:
+        del outgoing[:client.send(outgoing)]
+    except BlockingIOError:
+        pass
+    return bool(outgoing)
+
+def measure(mode, connections, duration, send_rate, port):
+    server = subprocess.Popen([sys.executable, SERVER_SCRIPT, '--mode', mode, '--port', str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        idle_rss = process_rss_kb(server.pid)
+
+        selector = selectors.DefaultSelector()
+        clients = []
+        for i in range(connections):
+            client = socket.create_connection(('localhost', port))
+            client.setblocking(False)
+            state = {'decoder': FrameDecoder(), 'ack': 0, 'pos': (float(i), float(i)), 'outgoing': bytearray()}
+            selector.register(client, selectors.EVENT_READ, state)
+            clients.append((client, state))
+
+        snapshots = 0
+        next_send = time.perf_counter()
+        start = time.perf_counter()
+        start_cpu = process_cpu_seconds(server.pid)
+        while time.perf_counter() - start < duration:
+            for key, mask in selector.select(timeout=0.005):
+                if mask & selectors.EVENT_WRITE and not flush(key.fileobj, key.data['outgoing']):
+                    selector.modify(key.fileobj, selectors.EVENT_READ, key.data)
+                if not mask & selectors.EVENT_READ:
+                    continue
+                try:
+                    received = key.data['decoder'].recv_into(key.fileobj)
+                except BlockingIOError:
+                    continue
+                if not received:
+                    # A closed connection stays readable, carrying on would spin on it and skew the results
+                    raise RuntimeError(f"The {mode} server closed a connection during the run")
+                for message in key.data['decoder'].messages():
+                    if message['type'] == 'snapshot':
+                        key.data['ack'] = message['seq']
+                        snapshots += 1
+            if time.perf_counter() >= next_send:
+                next_send += 1 / send_rate
+                for client, state in clients:
+                    if state['outgoing']:
+                        continue  # Still backed up, this move is dropped like a late frame would be
+                    state['outgoing'] += encode({'type': 'move', 'ack': state['ack'], 'pos': state['pos'], 'angle': 0.0})
+                    if flush(client, state['outgoing']):
+                        selector.modify(client, selectors.EVENT_READ | selectors.EVENT_WRITE, state)
+        elapsed = time.perf_counter() - start
+        cpu = process_cpu_seconds(server.pid) - start_cpu
+        rss = process_rss_kb(server.pid)
+
+        for client, _ in clients:
+            client.close()
+        return {
+            'mode': mode,
+            'connections': connections,
+            'cpu_percent': cpu / elapsed * 100,
+            'rss_mb': rss / 1024,
+            'kb_per_connection': (rss - idle_rss) / connections,
+            'snapshots_per_sec': snapshots / elapsed,
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Server connection scaling benchmark")
+    parser.add_argument('--connections', type=int, nargs='+', default=[50, 100, 200, 400])
+    parser.add_argument('--modes', nargs='+', default=['threaded', 'async', 'sharded'])
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds measured per run')
+    parser.add_argument('--send-rate', type=float, default=30.0, help='Moves per second sent by each client')
+    parser.add_argument('--port', type=int, default=5600)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'conns':>7}{'cpu %':>9}{'rss MB':>9}{'KB/conn':>10}{'snaps/s':>10}")
+    for mode in args.modes:
+        for connections in args.connections:
+            result = measure(mode, connections, args.duration, args.send_rate, args.port)
+            print(f"{result['mode']:<10}{result['connections']:>7}{result['cpu_percent']:>9.1f}{result['rss_mb']:>9.1f}"
+                  f"{result['kb_per_connection']:>10.1f}{result['snapshots_per_sec']:>10.0f}")
+
+if __name__ == "__main__":
+    main()
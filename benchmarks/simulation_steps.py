@@ -0,0 +1,42 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from simulation import World, InputCommand
+from settings import GAME_WIDTH, GAME_HEIGHT, ASTEROID_COUNT, FPS
+
+# Headless steps per second of simulation.World, no pygame or SDL involved
+
+def measure(players, asteroids, steps, seed):
+    world = World(GAME_WIDTH, GAME_HEIGHT, seed=seed)
+    world.spawn_asteroids(asteroids)
+    for player_id in range(1, players + 1):
+        world.add_player(player_id)
+    rng = random.Random(seed)
+    commands = [{player_id: InputCommand(rng.choice([-1, 0, 1])) for player_id in range(1, players + 1)} for _ in range(64)]
+
+    start = time.perf_counter()
+    for step in range(steps):
+        world.step(1 / FPS, commands[step % len(commands)])
+    elapsed = time.perf_counter() - start
+    return steps / elapsed, sum(world.scores.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation steps per second")
+    parser.add_argument('--players', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--asteroids', type=int, nargs='+', default=[ASTEROID_COUNT, 10000])
+    parser.add_argument('--steps', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'players':>8}{'asteroids':>11}{'steps/s':>11}{'pickups':>9}")
+    for asteroids in args.asteroids:
+        for players in args.players:
+            rate, pickups = measure(players, asteroids, args.steps, args.seed)
+            print(f"{players:>8}{asteroids:>11}{rate:>11.0f}{pickups:>9}")
+
+if __name__ == "__main__":
+    main()
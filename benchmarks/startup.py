@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, SERVER_SCRIPT, wait_for_port
+
+# Time to first frame of the client and time until the server accepts connections, from launching the process, so
+# interpreter startup is included. Each launch also writes its own --profile-startup phases, the medians of those
+# show where the time went. Results can be written as JSON and compared against later, failing on regressions.
+
+NOISE_FLOOR_MS = 20
+
+def wait_for_file(path, process, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while not os.path.exists(path):
+        if process.poll() is not None or time.perf_counter() > deadline:
+            raise RuntimeError(f"{process.args[1]} exited or timed out before reporting its startup")
+        time.sleep(0.001)
+
+def launch(command, report, port=None):
+    # Returns the launch to ready time and the phases the process reported
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy')
+    start = time.perf_counter()
+    process = subprocess.Popen(command + ['--profile-startup', report], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if port is None:
+            wait_for_file(report, process)  # Written right after the first frame is flipped
+        else:
+            wait_for_port(port, process=process, timeout=30, interval=0.001)
+            wait_for_file(report, process)
+        ready = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+    with open(report) as f:
+        phases = json.load(f)['phases_ms']
+    os.remove(report)
+    return ready * 1000, phases
+
+def measure(name, command, runs, port=None):
+    readies, phases = [], {}
+    with tempfile.TemporaryDirectory() as directory:
+        for run in range(runs):
+            ready, reported = launch(command, os.path.join(directory, f'{run}.json'), port)
+            readies.append(ready)
+            for phase, ms in reported.items():
+                phases.setdefault(phase, []).append(ms)
+    return {'name': name, 'ready_ms': statistics.median(readies), 'max_ready_ms': max(readies),
+            'phases_ms': {phase: statistics.median(values) for phase, values in phases.items()}}
+
+def main():
+    parser = argparse.ArgumentParser(description="Client time to first frame and server time to ready")
+    parser.add_argument('--runs', type=int, default=5, help='Launches per target, medians are reported')
+    parser.add_argument('--server-modes', nargs='*', default=['threaded', 'async', 'sharded'])
+    parser.add_argument('--port', type=int, default=5611)
+    parser.add_argument('--out', metavar='PATH', help='Write the results as JSON, to use as a baseline later')
+    parser.add_argument('--baseline', metavar='PATH', help='Exit non-zero if any target got slower than this')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown against the baseline, as a fraction')
+    args = parser.parse_args()
+
+    targets = [('client', [sys.executable, 'main.py'], None)]
+    targets += [(f'server {mode}', [sys.executable, SERVER_SCRIPT, '--mode', mode, '--port', str(args.port)], args.port)
+                for mode in args.server_modes]
+    results = []
+    for name, command, port in targets:
+        result = measure(name, command, args.runs, port)
+        results.append(result)
+        phases = '  '.join(f"{phase} {ms:.1f}" for phase, ms in result['phases_ms'].items())
+        print(f"{name:<16} ready {result['ready_ms']:7.1f} ms (max {result['max_ready_ms']:.1f})  phases ms: {phases}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {result['name']: result for result in json.load(f)['results']}
+        regressions = [f"{result['name']}: ready {baseline[result['name']]['ready_ms']:.1f} -> {result['ready_ms']:.1f} ms"
+                       for result in results if result['name'] in baseline
+                       and result['ready_ms'] > baseline[result['name']]['ready_ms'] * (1 + args.tolerance) + NOISE_FLOOR_MS]
+        for line in regressions:
+            print(f"Regression: {line}")
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import json
+import os
+import time
+import settings
+
+# One typed config for the client and the server. Defaults come from settings.py, then a JSON file (--config), then
+# SPACEMINER_* environment variables, then --set NAME=VALUE, each overriding the one before. Shared fields are the
+# rules both sides have to agree on: the server sends its values in the welcome message and a client adopts them for
+# the session. Reloadable fields are the tuning knobs, poll() picks up changes to the file while running so load tests
+# can sweep them without restarting anything. Other fields in a changed file are reported and left as they are.
+
+SHARED = 'shared'
+SERVER = 'server'
+CLIENT = 'client'
+
+FIELDS = {
+    # name: (type, default, scope, reloadable)
+    'game_size_multiplier': (int, settings.GAME_SIZE_MULTIPLIER, SHARED, False),
+    'asteroid_density': (float, settings.ASTEROID_DENSITY, SHARED, False),
+    'player_speed': (float, settings.PLAYER_SPEED, SHARED, False),
+    'player_rotate_speed': (float, settings.PLAYER_ROTATE_SPEED, SHARED, False),
+    'time_limit': (float, settings.TIME_LIMIT, SHARED, False),
+    'asteroid_win_count': (int, settings.ASTEROID_WIN_COUNT, SHARED, False),
+    'fps': (int, settings.FPS, CLIENT, True),
+    'tick_rate': (int, settings.TICK_RATE, SERVER, True),
+    'snapshot_rate': (int, settings.SNAPSHOT_RATE, SERVER, True),
+    'interest_margin': (int, settings.INTEREST_MARGIN, SERVER, True),
+    'match_restart_delay': (float, settings.MATCH_RESTART_DELAY, SERVER, False),
+}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def convert(name, value):
+    if name not in FIELDS:
+        raise ConfigError(f"Unknown config field {name!r}")
+    kind = FIELDS[name][0]
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f"{name} must be a number, got {value!r}") from None
+    if kind is int and not number.is_integer():
+        raise ConfigError(f"{name} must be a whole number, got {value!r}")
+    if number < 0 or (number == 0 and name != 'asteroid_density'):  # An empty field is the only zero that makes sense
+        raise ConfigError(f"{name} must be positive, got {value!r}")
+    return kind(number)
+
+
+class Config:
+    def __init__(self, path=None, overrides=None, environ=None):
+        self.path = path
+        self.overrides = dict(overrides or {})
+        self.environ = None if environ is None else dict(environ)  # None reads os.environ, kept picklable for workers
+        self.mtime = None
+        self.next_poll = 0.0
+        for name, value in self.load().items():
+            setattr(self, name, value)
+
+    @property
+    def game_width(self):
+        return settings.WIDTH * self.game_size_multiplier
+
+    @property
+    def game_height(self):
+        return settings.HEIGHT * self.game_size_multiplier
+
+    @property
+    def asteroid_count(self):
+        return int(self.game_width * self.game_height * self.asteroid_density)
+
+    def load(self):
+        # Every field's value from all sources, raises ConfigError without changing anything
+        values = {name: kind(default) for name, (kind, default, _, _) in FIELDS.items()}
+        if self.path is not None:
+            try:
+                self.mtime = os.stat(self.path).st_mtime_ns
+                with open(self.path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                raise ConfigError(f"Can not read config file {self.path}: {e}") from None
+            if not isinstance(data, dict):
+                raise ConfigError(f"Config file {self.path} must hold a JSON object")
+            values.update({name: convert(name, value) for name, value in data.items()})
+        environ = os.environ if self.environ is None else self.environ
+        for name in FIELDS:
+            value = environ.get(settings.CONFIG_ENV_PREFIX + name.upper())
+            if value is not None:
+                values[name] = convert(name, value)
+        values.update({name: convert(name, value) for name, value in self.overrides.items()})
+        return values
+
+    def reload(self):
+        # Applies changed reloadable fields, returns {name: (old, new)} of those and the changed fields it could not apply
+        changed, ignored = {}, []
+        for name, value in self.load().items():
+            old = getattr(self, name)
+            if value == old:
+                continue
+            if FIELDS[name][3]:
+                setattr(self, name, value)
+                changed[name] = (old, value)
+            else:
+                ignored.append(name)
+        return changed, ignored
+
+    def poll(self):
+        # Reloads when the config file changed, at most every CONFIG_POLL_INTERVAL. Returns lines describing what
+        # happened, none when nothing changed, so the caller can print or log them.
+        now = time.monotonic()
+        if self.path is None or now < self.next_poll:
+            return []
+        self.next_poll = now + settings.CONFIG_POLL_INTERVAL
+        try:
+            if os.stat(self.path).st_mtime_ns == self.mtime:
+                return []
+            changed, ignored = self.reload()
+        except (OSError, ConfigError) as e:
+            return [f"Config not reloaded, keeping the current values: {e}"]
+        lines = [f"Config {name}: {old} -> {new}" for name, (old, new) in changed.items()]
+        lines += [f"Config {name} changed in {self.path}, takes a restart" for name in ignored]
+        return lines
+
+    def shared(self):
+        return {name: getattr(self, name) for name, field in FIELDS.items() if field[2] == SHARED}
+
+    def adopt(self, values):
+        # Copy of this config with the shared fields the server sent, the rules of a multiplayer session
+        adopted = Config.__new__(Config)
+        adopted.__dict__.update(self.__dict__)
+        adopted.path = None  # The server owns the shared fields, local file changes do not apply to them
+        for name, value in values.items():
+            if name in FIELDS and FIELDS[name][2] == SHARED:
+                setattr(adopted, name, convert(name, value))
+        return adopted
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in FIELDS}
+
+
+def add_arguments(parser):
+    parser.add_argument('--config', metavar='PATH', help='JSON file of config fields, watched for changes to the tuning knobs')
+    parser.add_argument('--set', metavar='NAME=VALUE', action='append', default=[], dest='config_set',
+                        help=f"Override a config field, can be repeated. Fields: {', '.join(FIELDS)}")
+
+
+def from_args(parser, args):
+    overrides = {}
+    for item in args.config_set:
+        name, separator, value = item.partition('=')
+        if not separator:
+            parser.error(f"--set expects NAME=VALUE, got {item!r}")
+        overrides[name.strip()] = value.strip()
+    try:
+        return Config(args.config, overrides)
+    except ConfigError as e:
+        parser.error(str(e))
@@ -0,0 +1,281 @@
+import numpy as np
+from settings import GAME_WIDTH, GAME_HEIGHT, FPS, PLAYER_SPEED, PLAYER_ROTATE_SPEED, PLAYER_HEIGHT, PLAYER_WIDTH
+from settings import ASTEROID_HEIGHT, ASTEROID_WIDTH, SPATIAL_CELL_SIZE
+from array_snapshot import PLAYER_RECORD, ASTEROID_RECORD
+
+# Array-backed counterpart of simulation.World for servers with very large worlds. Entities live in parallel
+# NumPy arrays (structure of arrays) so movement, bouncing and collision run as a handful of vector operations.
+
+NEIGHBOUR_OFFSETS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+
+class EntityStore:
+    def __init__(self, capacity=1024):
+        self.ids = np.zeros(capacity, np.int64)
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.angle = np.zeros(capacity, np.float32)
+        self.alive = np.zeros(capacity, bool)
+        self.owner = np.full(capacity, -1, np.int32)  # Owning player, for asteroids the player that collected it
+        self.slots = {}  # Entity id -> slot
+        self.free = []  # Slots of removed entities, reused before the store grows
+        self.count = 0  # Slots in use or freed, everything past it is untouched
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, entity_id):
+        return entity_id in self.slots
+
+    def reserve(self, count):
+        capacity = len(self.ids)
+        if self.count + count <= capacity:
+            return
+        capacity = max(capacity * 2, self.count + count)
+        for name in ('ids', 'x', 'y', 'angle', 'alive', 'owner'):
+            old = getattr(self, name)
+            new = np.full(capacity, -1, old.dtype) if name == 'owner' else np.zeros(capacity, old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add(self, entity_id, x, y, angle, owner=-1):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            self.reserve(1)
+            slot = self.count
+            self.count += 1
+        self.ids[slot] = entity_id
+        self.x[slot], self.y[slot], self.angle[slot] = x, y, angle
+        self.alive[slot] = True
+        self.owner[slot] = owner
+        self.slots[entity_id] = slot
+        return slot
+
+    def add_many(self, ids, x, y, angle):
+        # Bulk insert at the end of the store, used for spawning whole asteroid fields
+        count = len(ids)
+        self.reserve(count)
+        start, end = self.count, self.count + count
+        self.ids[start:end] = ids
+        self.x[start:end], self.y[start:end], self.angle[start:end] = x, y, angle
+        self.alive[start:end] = True
+        self.owner[start:end] = -1
+        self.slots.update(zip(np.asarray(ids).tolist(), range(start, end)))
+        self.count = end
+
+    def remove(self, entity_id):
+        slot = self.slots.pop(entity_id)
+        self.alive[slot] = False
+        self.free.append(slot)
+        return slot
+
+    def live_slots(self):
+        return np.flatnonzero(self.alive[:self.count])
+
+    def records(self, slots, dtype):
+        # The entities in slots as snapshot records sorted by id, see array_snapshot.py
+        slots = slots[np.argsort(self.ids[slots], kind='stable')]
+        records = np.empty(len(slots), dtype)
+        records['id'] = self.ids[slots]
+        records['x'] = self.x[slots]
+        records['y'] = self.y[slots]
+        records['angle'] = self.angle[slots]
+        return records
+
+class ArrayWorld:
+    # Same interface as simulation.World as far as the server uses it
+    def __init__(self, width=GAME_WIDTH, height=GAME_HEIGHT, seed=None, speed=PLAYER_SPEED, rotate_speed=PLAYER_ROTATE_SPEED):
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.rotate_speed = rotate_speed
+        self.random = np.random.default_rng(seed)
+        self.players = EntityStore()
+        self.asteroids = EntityStore()
+        self.scores = {}
+        self.last_asteroid_id = 0
+        self.time = 0.0
+
+        # Asteroid broad phase: slots sorted by grid cell, rebuilt whenever asteroids are added
+        self.rows = int(height // SPATIAL_CELL_SIZE) + 3
+        self.asteroid_order = np.zeros(0, np.int64)
+        self.asteroid_cells = np.zeros(0, np.int64)
+        self.asteroid_state = None  # Asteroid records, reused by to_state until the field changes
+        self.removed_asteroids = []  # Collected since asteroid_state was last built
+        self.player_order = np.zeros(0, np.int64)  # Same index for players, rebuilt by index_players when needed
+        self.player_cells = np.zeros(0, np.int64)
+
+    def cell_keys(self, x, y):
+        # One past the edge on every side so neighbour lookups never wrap
+        return (np.floor_divide(x, SPATIAL_CELL_SIZE).astype(np.int64) + 1) * self.rows + np.floor_divide(y, SPATIAL_CELL_SIZE).astype(np.int64) + 1
+
+    def index_asteroids(self):
+        count = self.asteroids.count
+        keys = self.cell_keys(self.asteroids.x[:count], self.asteroids.y[:count])
+        self.asteroid_order = np.argsort(keys, kind='stable')
+        self.asteroid_cells = keys[self.asteroid_order]
+        self.asteroid_state = None
+        self.removed_asteroids = []
+
+    def index_players(self):
+        slots = self.players.live_slots()
+        keys = self.cell_keys(self.players.x[slots], self.players.y[slots])
+        order = np.argsort(keys, kind='stable')
+        self.player_order = slots[order]
+        self.player_cells = keys[order]
+
+    def cell_area(self, x, y, half_width, half_height):
+        # Grid cells covering the box around (x, y), as (first column, first row, last column, last row) in index space
+        return (int((x - half_width) // SPATIAL_CELL_SIZE) + 1, max(0, int((y - half_height) // SPATIAL_CELL_SIZE) + 1),
+                int((x + half_width) // SPATIAL_CELL_SIZE) + 1, min(self.rows - 1, int((y + half_height) // SPATIAL_CELL_SIZE) + 1))
+
+    def slots_in(self, order, cells, area):
+        # Every slot in the area, one contiguous run of the sorted index per column
+        first_column, first_row, last_column, last_row = area
+        columns = np.arange(first_column, last_column + 1) * self.rows
+        first = np.searchsorted(cells, columns + first_row, 'left')
+        last = np.searchsorted(cells, columns + last_row, 'right')
+        return np.concatenate([order[start:end] for start, end in zip(first.tolist(), last.tolist())])
+
+    def asteroids_in(self, area):
+        # Live slots, build records from them with self.asteroids.records
+        slots = self.slots_in(self.asteroid_order, self.asteroid_cells, area)
+        return slots[self.asteroids.alive[slots]]
+
+    def players_in(self, area):
+        # Uses the index from the last index_players call
+        slots = self.slots_in(self.player_order, self.player_cells, area)
+        return slots[self.players.alive[slots]]
+
+    def spawn_asteroids(self, count):
+        ids = np.arange(self.last_asteroid_id + 1, self.last_asteroid_id + count + 1)
+        self.last_asteroid_id += count
+        x = self.random.integers(10, self.width - 10, count, endpoint=True)
+        y = self.random.integers(10, self.height - 10, count, endpoint=True)
+        angle = self.random.choice([0, 90, 180, 270], count)
+        self.asteroids.add_many(ids, x, y, angle)
+        self.index_asteroids()
+
+    def clear_asteroids(self):
+        self.asteroids = EntityStore()
+        self.index_asteroids()
+
+    def remove_asteroid(self, asteroid_id):
+        # Dead slots stay in the broad phase index and are filtered by the alive flag
+        self.asteroids.remove(asteroid_id)
+        self.removed_asteroids.append(asteroid_id)
+
+    def add_player(self, player_id, pos=None, angle=None):
+        x, y = pos if pos is not None else (self.width // 2, self.height // 2)
+        angle = angle if angle is not None else self.random.uniform(0, 360)
+        self.scores[player_id] = 0
+        return self.players.add(player_id, x, y, angle, owner=player_id)
+
+    def remove_player(self, player_id):
+        self.scores.pop(player_id, None)
+        if player_id in self.players:
+            self.players.remove(player_id)
+
+    def player_pos(self, player_id):
+        slot = self.players.slots[player_id]
+        return float(self.players.x[slot]), float(self.players.y[slot])
+
+    def set_player(self, player_id, pos, angle):
+        slot = self.players.slots[player_id]
+        self.players.x[slot], self.players.y[slot] = pos
+        self.players.angle[slot] = angle
+
+    def move_players(self, slots, rotate, dt):
+        players = self.players
+        angle = (players.angle[slots] + rotate * (self.rotate_speed * FPS * dt)) % 360
+        radians = np.radians(angle)
+        dx, dy = np.cos(radians), np.sin(radians)
+        x = players.x[slots] + dx * (self.speed * FPS * dt)
+        y = players.y[slots] + dy * (self.speed * FPS * dt)
+
+        # Bounce off the edges of the game space
+        bounce_x = (x <= 10) | (x >= self.width - 10)
+        bounce_y = (y <= 10) | (y >= self.height - 10)
+        dx[bounce_x] *= -1
+        dy[bounce_y] *= -1
+        bounced = bounce_x | bounce_y
+        angle[bounced] = np.degrees(np.arctan2(dy[bounced], dx[bounced]))
+
+        players.x[slots] = np.clip(x, 10, self.width - 10)
+        players.y[slots] = np.clip(y, 10, self.height - 10)
+        players.angle[slots] = angle
+
+    def collide(self, slots):
+        # Returns (player slot, asteroid slot) pairs for every overlap, each asteroid at most once
+        if not len(slots) or not len(self.asteroid_cells):
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        players, asteroids = self.players, self.asteroids
+        px, py = players.x[slots], players.y[slots]
+
+        # Broad phase: every asteroid in the 3x3 cells around each player, found with binary search on the sorted cells
+        column = np.floor_divide(px, SPATIAL_CELL_SIZE).astype(np.int64) + 1
+        row = np.floor_divide(py, SPATIAL_CELL_SIZE).astype(np.int64) + 1
+        keys = ((column[:, None] + NEIGHBOUR_OFFSETS[:, 0]) * self.rows + row[:, None] + NEIGHBOUR_OFFSETS[:, 1]).ravel()
+        first = np.searchsorted(self.asteroid_cells, keys, 'left')
+        counts = np.searchsorted(self.asteroid_cells, keys, 'right') - first
+        total = counts.sum()
+        if not total:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        starts = np.repeat(first - (np.cumsum(counts) - counts), counts)
+        candidates = self.asteroid_order[starts + np.arange(total)]
+        owners = np.repeat(np.arange(len(keys)) // len(NEIGHBOUR_OFFSETS), counts)
+
+        # Narrow phase: the same axis aligned boxes as simulation.World
+        hit = asteroids.alive[candidates]
+        hit &= np.abs(px[owners] - asteroids.x[candidates]) < (PLAYER_WIDTH + ASTEROID_WIDTH) / 2
+        hit &= np.abs(py[owners] - asteroids.y[candidates]) < (PLAYER_HEIGHT + ASTEROID_HEIGHT) / 2
+        player_slots, asteroid_slots = slots[owners[hit]], candidates[hit]
+        asteroid_slots, first_hit = np.unique(asteroid_slots, return_index=True)
+        return player_slots[first_hit], asteroid_slots
+
+    def step(self, dt, commands=None):
+        # Advances every commanded player by dt seconds, returns the (player id, asteroid id) pickups
+        commands = commands or {}
+        player_slots = self.players.slots
+        player_ids = [player_id for player_id in commands if player_id in player_slots]
+        pickups = []
+        if player_ids:
+            slots = np.fromiter((player_slots[player_id] for player_id in player_ids), np.int64, len(player_ids))
+            rotate = np.fromiter((commands[player_id].rotate for player_id in player_ids), np.float32, len(player_ids))
+            self.move_players(slots, rotate, dt)
+            player_slots, asteroid_slots = self.collide(slots)
+            pickups = self.collect(player_slots, asteroid_slots)
+        self.time += dt
+        return pickups
+
+    def pickup(self, player_ids):
+        # Collects whatever the players overlap where they stand, for positions set from outside with set_player
+        player_slots = self.players.slots
+        player_ids = [player_id for player_id in player_ids if player_id in player_slots]
+        if not player_ids:
+            return []
+        slots = np.fromiter((player_slots[player_id] for player_id in player_ids), np.int64, len(player_ids))
+        return self.collect(*self.collide(slots))
+
+    def collect(self, player_slots, asteroid_slots):
+        player_ids = self.players.ids[player_slots].tolist()
+        asteroid_ids = self.asteroids.ids[asteroid_slots].tolist()
+        self.asteroids.owner[asteroid_slots] = player_ids
+        for player_id, asteroid_id in zip(player_ids, asteroid_ids):
+            self.remove_asteroid(asteroid_id)
+            self.scores[player_id] += 1
+        return list(zip(player_ids, asteroid_ids))
+
+    def to_state(self):
+        # Asteroids never move, so their records are shared by every snapshot until one is collected.
+        # Collections build a new array rather than edit it because older snapshots still hold the previous one.
+        if self.asteroid_state is None:
+            self.asteroid_state = self.asteroids.records(self.asteroids.live_slots(), ASTEROID_RECORD)
+        elif self.removed_asteroids:
+            # Copied as opaque records, NumPy copies packed big-endian records field by field and far slower
+            records = self.asteroid_state
+            opaque = records.view(np.dtype((np.void, records.itemsize)))
+            self.asteroid_state = np.delete(opaque, np.searchsorted(records['id'], self.removed_asteroids)).view(ASTEROID_RECORD)
+        self.removed_asteroids = []
+        return {'players': self.players.records(self.players.live_slots(), PLAYER_RECORD), 'asteroids': self.asteroid_state,
+                'scores': dict(self.scores)}
@@ -2,65 +2,111 @@ import pygame
 from enums import GameState, Colour
 from player import Player
 from asteroid import Asteroid
-from settings import WIDTH, GAME_WIDTH, GAME_HEIGHT, ASTEROID_COUNT, ASTEROID_WIN_COUNT, TIME_LIMIT, STAR_DENSITY
-from utils import display_main_menu, display_pause_menu, display_end_screen
-from network import Network
+from settings import WIDTH, HEIGHT, INTERPOLATION_DELAY, SPATIAL_CELL_SIZE, VIEW_MARGIN, SIMULATION_STEP, MAX_CATCH_UP_STEPS
+from spatial import SpatialHash
+from background import Starfield
+from simulation import World, InputCommand
+from utils import display_main_menu, display_pause_menu, display_end_screen, render_text
+from profiler import FrameProfiler
+from log import TRACE
+from config import Config
+import logging
 import random
 import sys
+import time
+
+logger = logging.getLogger(__name__)
 
 class Game:
-    def __init__(self, window, debug=False):
+    def __init__(self, window, debug=False, profiler=None, seed=None, recorder=None, config=None):
         self.window = window
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont(None, 36)
-        self.large_font = pygame.font.SysFont(None, 72)
+        # The default font needs no system font scan, which SysFont runs on first use even for None
+        self.font = pygame.font.Font(None, 36)
+        self.large_font = pygame.font.Font(None, 72)
         self.camera_offset = pygame.Vector2(0, 0)
         self.debug = debug
+        self.profiler = profiler or FrameProfiler(enabled=False)
+        self.random = random.Random(seed)  # Every world and the background are seeded from this, so a session can be replayed
+        self.recorder = recorder
+        self.config = config or Config()
+        self.rules = self.config  # Shared fields of the session, the server's while in multiplayer
         self.game_state = GameState.MAIN_MENU
         self.network = None
         self.player_id = None
+        self.drawn_screen = None  # Static screen currently on the window, it is only drawn again when this changes
+        self.updated_state = None  # State during the last update, to notice when play starts or resumes
+        self.screen_surface = None
         
+        self.world = None  # Created by reset_game once a mode is picked, the menus don't need one
         self.background = self.create_background()
-        self.reset_game()
 
     def create_background(self):
-        STAR_COUNT = int(GAME_WIDTH * GAME_HEIGHT * STAR_DENSITY)
-        stars = [(random.randint(0, GAME_WIDTH), random.randint(0, GAME_HEIGHT)) for _ in range(STAR_COUNT)]
-        background = pygame.Surface((GAME_WIDTH, GAME_HEIGHT))
-        print(f"Created background with dimensions {background.get_size()}") if self.debug else None
-        background.fill(Colour.DARK_GREY)
-        for (x, y) in stars:
-            pygame.draw.rect(background, Colour.WHITE, (x, y, 2, 2))
+        # Chunks are drawn lazily as they come into view, so nothing is rendered up front
+        background = Starfield(self.random.getrandbits(32))
+        logger.debug("Created background with %spx chunks, seed %s", background.chunk_size, background.seed)
         return background
 
-    def reset_game(self):
+    def reset_game(self, asteroid_count=None, player_id=1, seed=None):
+        rules = self.rules
         self.score = 0
-        self.start_time = pygame.time.get_ticks()
+        self.time_left = rules.time_limit  # Counted down by the server in multiplayer
+        self.accumulator = 0.0  # Frame time not yet simulated, less than one step
+        self.previous_player = None  # Local player state before the last step, rendering blends towards the current one
         self.all_sprites = pygame.sprite.Group()
         self.asteroid_group = pygame.sprite.Group()
-        self.player = Player()
+        # Grids over world space so collisions and drawing only look at nearby sprites
+        self.asteroid_grid = SpatialHash(SPATIAL_CELL_SIZE)
+        self.player_grid = SpatialHash(SPATIAL_CELL_SIZE)
+
+        # The simulation owns positions and pickups, the sprites only render it
+        self.world = World(rules.game_width, rules.game_height, seed if seed is not None else self.random.getrandbits(32),
+                           rules.player_speed, rules.player_rotate_speed)
+        if asteroid_count is None:
+            asteroid_count = rules.asteroid_count
+        self.world.spawn_asteroids(asteroid_count)
+        self.player_id = player_id
+        state = self.world.add_player(player_id)
+        self.player = Player(state.angle)
+        self.player.update(state.serialize(), self.camera_offset, (self.world.width, self.world.height))
         self.all_sprites.add(self.player)
+        self.player_grid.insert(self.player, self.player.rect)
+
+        # Sprites by entity id, reconciled against each new state
+        self.remote_players = {}
+        self.asteroids = {}
+        self.asteroid_state = None
+        for asteroid_id, asteroid in self.world.asteroids.items():
+            self.add_asteroid(asteroid_id, asteroid.serialize())
         
-        for _ in range(ASTEROID_COUNT):
-            asteroid = Asteroid()
-            self.all_sprites.add(asteroid)
-            self.asteroid_group.add(asteroid)
-        
-        print(f"Game reset. Created {ASTEROID_COUNT} new asteroids") if self.debug else None
+        logger.debug("Game reset. Created %s new asteroids", asteroid_count)
+
+    def add_asteroid(self, asteroid_id, asteroid_data):
+        asteroid = self.asteroids[asteroid_id] = Asteroid.deserialize(asteroid_data)
+        self.all_sprites.add(asteroid)
+        self.asteroid_group.add(asteroid)
+        self.asteroid_grid.insert(asteroid, asteroid.rect)
+
+    def remove_asteroid(self, asteroid_id):
+        asteroid = self.asteroids.pop(asteroid_id)
+        asteroid.kill()
+        self.asteroid_grid.remove(asteroid)
 
     def handle_event(self, event):
-        if event.type == pygame.KEYDOWN:
+        if event.type in [pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED]:
+            self.invalidate()  # Uncovered windows lose their contents
+        elif event.type == pygame.KEYDOWN:
             if self.game_state == GameState.MAIN_MENU:
                 if event.key == pygame.K_1:
+                    self.stop_multiplayer()
                     self.reset_game()  # Reset the game when starting a new game
                     self.game_state = GameState.PLAYING
                 elif event.key == pygame.K_2:
                     self.start_multiplayer()
                 elif event.key == pygame.K_3:
-                    print("Options menu not implemented yet.")
+                    logger.info("Options menu not implemented yet.")
                 elif event.key == pygame.K_4:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
             elif self.game_state == GameState.PLAYING:
                 if event.key == pygame.K_p:
                     self.game_state = GameState.PAUSED
@@ -68,98 +114,288 @@ class Game:
                 if event.key == pygame.K_p:
                     self.game_state = GameState.PLAYING
                 elif event.key == pygame.K_m:
+                    self.stop_multiplayer()
                     self.game_state = GameState.MAIN_MENU
-                elif event.key == pygame.K_r:
-                    self.reset_game()
+                elif event.key == pygame.K_r and not self.network:
+                    self.reset_game()  # Only single player matches can be reset
                     self.game_state = GameState.PLAYING
                 elif event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
             elif self.game_state in [GameState.WON, GameState.GAME_OVER]:
-                if event.key == pygame.K_r:
-                    self.reset_game()
+                if event.key == pygame.K_r and not self.network:
+                    self.reset_game()  # In multiplayer the server starts the next match on its own
                     self.game_state = GameState.PLAYING
                 elif event.key == pygame.K_m:
+                    self.stop_multiplayer()
                     self.game_state = GameState.MAIN_MENU
                 elif event.key == pygame.K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
+
+    def quit(self):
+        pygame.quit()
+        sys.exit()
+
+    def now(self):
+        # Clock for snapshot interpolation, a replay substitutes the recorded session time
+        return time.perf_counter()
 
-    def start_multiplayer(self):
+    def connect(self, host, port):
+        from network import Network  # Networking is only loaded for multiplayer
+        return Network(host, port, clock=self.now, recorder=self.recorder)
+
+    def start_multiplayer(self, host='localhost', port=5555):
+        self.stop_multiplayer()  # A session left from the menu must not keep its connection, or its player, alive
         try:
-            self.network = Network()
-            self.player_id = self.network.receive()
-            print(f"Player ID: {self.player_id}") if self.debug else None
+            self.network = self.connect(host, port)
+            welcome = self.network.receive()
+            player_id = welcome['player_id']
+            self.rules = self.config.adopt(welcome['config'])  # The server's world size and rules, whatever ours say
+            logger.debug("Player ID: %s, rules: %s", player_id, self.rules.shared())
+            self.reset_game(asteroid_count=0, player_id=player_id)  # The server owns the asteroid field
             initial_game_state = self.network.receive()
-            print(f"Initial game state: {initial_game_state}") if self.debug else None
-            self.update_multiplayer(initial_game_state)
+            logger.log(TRACE, "Initial game state: %s", initial_game_state)
+            self.network.apply_snapshot(initial_game_state)
+            self.network.start()
+            self.update_multiplayer(self.network.buffered_states()[-1][1])
             self.game_state = GameState.PLAYING
         except Exception as e:
-            print(f"Unable to connect to server: {e}")
+            logger.error("Unable to connect to server: %s", e)
+            self.stop_multiplayer()
             self.game_state = GameState.MAIN_MENU
 
+    def stop_multiplayer(self):
+        if self.network:
+            self.network.close()
+            self.network = None
+        self.rules = self.config
+
     def update(self, dt):
         if self.game_state == GameState.PLAYING:
+            if self.updated_state != GameState.PLAYING:
+                dt = 0  # Time spent in menus or paused isn't simulated
             self.update_playing(dt)
         elif self.game_state == GameState.PAUSED:
             pass
         elif self.game_state in [GameState.WON, GameState.GAME_OVER]:
-            pass
+            if self.network:
+                # Keep following the server until it starts the next match
+                self.send_move()
+                self.sync_multiplayer()
+        self.updated_state = self.game_state
+
+    def simulation_steps(self, dt):
+        # Number of fixed steps due after a frame of dt seconds
+        self.accumulator += dt
+        steps = int(self.accumulator / SIMULATION_STEP)
+        self.accumulator -= steps * SIMULATION_STEP
+        if steps > MAX_CATCH_UP_STEPS:
+            # Too far behind to catch up: drop the backlog so the game slows down instead of every frame getting longer
+            logger.debug("Dropped %s simulation steps", steps - MAX_CATCH_UP_STEPS)
+            steps = MAX_CATCH_UP_STEPS
+        return steps
 
     def update_playing(self, dt):
+        # The simulation advances in fixed steps whatever the frame rate, rendering blends between the last two
+        for _ in range(self.simulation_steps(dt)):
+            self.simulate_step(SIMULATION_STEP)
+            if self.game_state != GameState.PLAYING:
+                break
+        self.render_local_player(self.accumulator / SIMULATION_STEP)
+        if self.network:
+            self.sync_multiplayer()
+
+    def simulate_step(self, dt):
+        self.previous_player = self.world.players[self.player_id].serialize()
         if self.network:
-            self.network.send({'type': 'move', 'pos': self.player.pos})
-            game_state = self.network.receive()
+            # The local player is predicted from input, remote players are interpolated between snapshots
+            self.step_local_player(dt)
+            self.send_move()
+            return
+
+        for _, asteroid_id in self.step_local_player(dt):
+            self.remove_asteroid(asteroid_id)
+        self.score = self.world.scores[self.player_id]
+        if self.score >= self.rules.asteroid_win_count:
+            self.game_state = GameState.WON
+        elif self.world.time >= self.rules.time_limit:
+            self.game_state = GameState.GAME_OVER
+
+    def send_move(self):
+        if not self.network.connected:
+            return
+        state = self.world.players[self.player_id]
+        with self.profiler.phase('network'):
+            try:
+                self.network.send({'type': 'move', 'ack': self.network.snapshots.latest, 'pos': (state.x, state.y), 'angle': state.angle})
+            except OSError as e:
+                logger.warning("Lost connection to server: %s", e)
+                self.network.connected = False
+
+    def sync_multiplayer(self):
+        if not self.network.connected:
+            self.stop_multiplayer()
+            self.game_state = GameState.MAIN_MENU
+            return
+        with self.profiler.phase('network'):
+            game_state = self.interpolated_state(self.now() - INTERPOLATION_DELAY)
+        if game_state is not None:
             self.update_multiplayer(game_state)
-        else:
-            self.all_sprites.update(self.camera_offset)
-            hits = pygame.sprite.spritecollide(self.player, self.asteroid_group, True)
-            if hits:
-                self.score += len(hits)
-            elapsed_time = (pygame.time.get_ticks() - self.start_time) / 1000
-            if self.score >= ASTEROID_WIN_COUNT:
-                self.game_state = GameState.WON
-            elif elapsed_time >= TIME_LIMIT:
-                self.game_state = GameState.GAME_OVER
+
+    def read_input(self):
+        keys = pygame.key.get_pressed()
+        return InputCommand(rotate=keys[pygame.K_RIGHT] - keys[pygame.K_LEFT])
+
+    def step_local_player(self, dt):
+        # Returns the (player id, asteroid id) pickups, there are none in multiplayer where the server owns the asteroids
+        command = self.read_input()
+        if self.recorder:
+            self.recorder.input(command)
+        pickups = self.world.step(dt, {self.player_id: command})
+        state = self.world.players[self.player_id]
+        self.player.trail.add(state.x, state.y)  # Sampled per step so trails look the same at any frame rate
+        return pickups
+
+    def render_local_player(self, alpha):
+        # Places the sprite alpha of the way from the previous step to the current one
+        current = self.world.players[self.player_id].serialize()
+        previous = self.previous_player or current
+        (x0, y0), (x1, y1) = previous['pos'], current['pos']
+        turn = (current['angle'] - previous['angle'] + 180) % 360 - 180  # Shortest way round
+        self.player.update({'pos': (x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha), 'angle': (previous['angle'] + turn * alpha) % 360},
+                           self.camera_offset, (self.world.width, self.world.height))
+        self.player_grid.move(self.player, self.player.rect)
+
+    def interpolated_state(self, render_time):
+        states = self.network.buffered_states()
+        if not states:
+            return None
+        latest = states[-1][1]
+        if render_time >= states[-1][0] or len(states) == 1:
+            return latest
+        if render_time <= states[0][0]:
+            return dict(latest, players=states[0][1]['players'])
+
+        for (older_time, older), (newer_time, newer) in zip(states, states[1:]):
+            if older_time <= render_time <= newer_time:
+                break
+        t = (render_time - older_time) / (newer_time - older_time) if newer_time > older_time else 1
+
+        players = {}
+        for player_id, data in newer['players'].items():
+            previous = older['players'].get(player_id)
+            if previous is None:
+                players[player_id] = data
+                continue
+            (x0, y0), (x1, y1) = previous['pos'], data['pos']
+            turn = (data['angle'] - previous['angle'] + 180) % 360 - 180  # Shortest way round
+            players[player_id] = {'pos': (x0 + (x1 - x0) * t, y0 + (y1 - y0) * t), 'angle': (previous['angle'] + turn * t) % 360}
+        return dict(latest, players=players)
 
     def update_multiplayer(self, game_state):
-        if self.debug:
-            print("Updating multiplayer game state")
-            print(f"Received game state: {game_state}")
-        self.all_sprites.empty()
-        self.asteroid_group.empty()
-        for player_id, player_data in game_state['players'].items():
-            print(f"Adding player {player_id} at position {player_data['pos']}") if self.debug else None
-            player = Player.deserialize(player_data)
-            self.all_sprites.add(player)
+        # Pickups, scores and the match result all come from the server
+        self.score = game_state['scores'].get(self.player_id, 0)
+        self.time_left = game_state['time_left']
+        winner = game_state['winner']
+        if winner:
+            self.game_state = GameState.WON if winner == self.player_id else GameState.GAME_OVER
+        elif self.time_left <= 0:
+            self.game_state = GameState.GAME_OVER
+        elif self.game_state in [GameState.WON, GameState.GAME_OVER]:
+            logger.debug("Next match started")
+            self.game_state = GameState.PLAYING
+
+        # Entities are only created when they first appear and killed when they leave, the rest are updated in place
+        players = game_state['players']
+        for player_id in self.remote_players.keys() - players.keys():
+            logger.debug("Removing player %s", player_id)
+            player = self.remote_players.pop(player_id)
+            player.kill()
+            self.player_grid.remove(player)
+        for player_id, player_data in players.items():
             if player_id == self.player_id:
-                self.player = player
-        for asteroid_data in game_state['asteroids']:
-            print(f"Adding asteroid at position {asteroid_data['pos']} with angle {asteroid_data['angle']}") if self.debug else None
-            asteroid = Asteroid.deserialize(asteroid_data)
-            self.asteroid_group.add(asteroid)
-            self.all_sprites.add(asteroid)
+                continue  # Predicted locally, the server copy is one round trip behind
+            player = self.remote_players.get(player_id)
+            if player is None:
+                logger.debug("Adding player %s at position %s", player_id, player_data['pos'])
+                player = self.remote_players[player_id] = Player.deserialize(player_data)
+                self.all_sprites.add(player)
+                self.player_grid.insert(player, player.rect)
+            else:
+                player.apply_state(player_data)
+                self.player_grid.move(player, player.rect)
+            player.trail.add(player.pos.x, player.pos.y)  # Once per applied state, interpolated like the sprite
+
+        # The asteroid dict is only replaced when a new snapshot arrives
+        asteroids = game_state['asteroids']
+        if asteroids is self.asteroid_state:
+            return
+        self.asteroid_state = asteroids
+        for asteroid_id in self.asteroids.keys() - asteroids.keys():
+            logger.log(TRACE, "Removing asteroid %s", asteroid_id)
+            self.remove_asteroid(asteroid_id)
+        for asteroid_id in asteroids.keys() - self.asteroids.keys():
+            asteroid_data = asteroids[asteroid_id]
+            logger.log(TRACE, "Adding asteroid at position %s with angle %s", asteroid_data['pos'], asteroid_data['angle'])
+            self.add_asteroid(asteroid_id, asteroid_data)
+
+    def state_digest(self):
+        # Fingerprint of the simulation, a replay of a session has to end with the same one
+        import hashlib
+        if self.world is None:
+            return hashlib.sha1(self.game_state.name.encode()).digest()[:8]
+        players = sorted((player_id, player.x, player.y, player.angle) for player_id, player in self.world.players.items())
+        state = (self.game_state.name, self.score, round(self.world.time, 9), players, sorted(self.asteroids))
+        return hashlib.sha1(repr(state).encode()).digest()[:8]
+
+    def is_idle(self):
+        # Static screens only change on input, the main loop sleeps between events instead of running at FPS.
+        # A screen that still has to be drawn, like the first one, isn't idle.
+        return self.game_state != GameState.PLAYING and self.drawn_screen == self.game_state
+
+    def invalidate(self):
+        self.drawn_screen = None
 
     def draw(self):
+        # Returns the regions to update: None for the whole window, an empty list when nothing changed
+        if self.game_state == GameState.PLAYING:
+            self.draw_playing()  # The view scrolls with the player, so every pixel can change
+            self.drawn_screen = None
+            return None
+        if self.drawn_screen == self.game_state:
+            return []
+
         if self.game_state == GameState.MAIN_MENU:
-            display_main_menu(self.window, self.large_font, self.font, self.background, self.camera_offset)
-        elif self.game_state == GameState.PLAYING:
-            self.draw_playing()
+            self.screen_surface = display_main_menu(self.window, self.large_font, self.font, self.background, self.camera_offset)
         elif self.game_state == GameState.PAUSED:
-            display_pause_menu(self.window, self.large_font, self.font, self.background, self.camera_offset)
+            self.screen_surface = display_pause_menu(self.window, self.large_font, self.font, self.background, self.camera_offset,
+                                                     restart=not self.network)
         else:
-            display_end_screen(self.window, self.large_font, self.font, self.game_state, self.background, self.camera_offset)
+            self.screen_surface = display_end_screen(self.window, self.large_font, self.font, self.game_state, self.background, self.camera_offset,
+                                                     restart=not self.network)
+        self.drawn_screen = self.game_state
+        return None
+
+    def restore(self, rect):
+        # Redraws part of a static screen, for overlays drawn on top of it
+        if self.drawn_screen is not None:
+            self.window.blit(self.screen_surface, rect, rect)
 
     def draw_playing(self):
-        self.window.blit(self.background, -self.camera_offset)
-        for sprite in self.all_sprites:
-            print(f"Drawing sprite {sprite} at position {sprite.pos} and size {sprite.rect.size}") if self.debug else None
+        self.background.draw(self.window, self.camera_offset)
+        # Only sprites inside the camera view are drawn, asteroids first so players stay on top
+        view = pygame.Rect(self.camera_offset.x, self.camera_offset.y, WIDTH, HEIGHT)
+        visible_sprites = list(self.asteroid_grid.query(view))
+        visible_sprites += self.player_grid.query(view.inflate(VIEW_MARGIN * 2, VIEW_MARGIN * 2))
+        self.profiler.count('sprites drawn', len(visible_sprites))
+        for sprite in visible_sprites:
             sprite.draw(self.window, self.camera_offset)
-        score_text = self.font.render(f"Score: {self.score}", True, Colour.WHITE)
+        score_text = render_text(self.font, f"Score: {self.score}", Colour.WHITE)
         self.window.blit(score_text, (10, 10))
-        elapsed_time = (pygame.time.get_ticks() - self.start_time) / 1000
-        time_remaining = max(0, TIME_LIMIT - elapsed_time)
+        if self.network:
+            time_remaining = self.time_left
+        else:
+            time_remaining = max(0, self.rules.time_limit - self.world.time)
         minutes = int(time_remaining) // 60
         seconds = int(time_remaining) % 60
-        timer_text = self.font.render(f"Time: {minutes}:{seconds:02}", True, Colour.WHITE)
+        timer_text = render_text(self.font, f"Time: {minutes}:{seconds:02}", Colour.WHITE)
         self.window.blit(timer_text, (WIDTH - timer_text.get_width() - 10, 10))
\ No newline at end of file
@@ -0,0 +1,11 @@
+import logging
+
+# Shared logging setup for the client. Messages go through the standard logging module with %-style arguments, so a
+# disabled level costs one integer comparison and nothing is formatted. TRACE is below DEBUG for per-message and
+# per-entity detail that would drown out everything else at --debug.
+
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+
+def setup(level=logging.INFO):
+    logging.basicConfig(level=level, format='%(asctime)s %(levelname)s %(name)s: %(message)s', datefmt='%H:%M:%S')
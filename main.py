@@ -1,39 +1,111 @@
-import pygame
+from startup import StartupTimer  # First, so the startup clock covers every other import
 import os
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'  # Only read when pygame is imported
+import pygame
 import sys
 import argparse
+import logging
+import random
+import log
+import config as game_config
 from game import Game
-from settings import WIDTH, HEIGHT, FPS
+from profiler import FrameProfiler, PerformanceHUD
+from settings import WIDTH, HEIGHT, IDLE_WAKE_INTERVAL
 
-# doesn't work
-os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
+logger = logging.getLogger(__name__)
 
 def main():
     parser = argparse.ArgumentParser(description="Space Miner Game")
-    parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--debug', action='store_true', help='Enable debug mode: debug logging and the performance overlay')
+    parser.add_argument('--log-level', choices=['TRACE', 'DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Logging level, DEBUG with --debug and INFO otherwise')
+    parser.add_argument('--profile-out', metavar='PATH', help='Write per-frame phase timings to a .csv or .json file on exit')
+    parser.add_argument('--record', metavar='PATH', help='Record the session for replay.py')
+    parser.add_argument('--seed', type=int, help='Seed for world generation, random by default')
+    parser.add_argument('--profile-startup', metavar='PATH', nargs='?', const='-',
+                        help='Report time spent per startup phase up to the first frame, as JSON when given a path')
+    game_config.add_arguments(parser)
     args = parser.parse_args()
+    config = game_config.from_args(parser, args)
+    startup = StartupTimer()
+    startup.mark('imports')
+
+    log.setup(logging.getLevelName(args.log_level or ('DEBUG' if args.debug else 'INFO')))
 
     pygame.init()
+    startup.mark('pygame.init')
     window = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Space Miner")
     clock = pygame.time.Clock()
+    startup.mark('display')
 
-    game = Game(window, debug=args.debug)
+    # Frame phases are only timed when something will look at them
+    profiler = FrameProfiler(enabled=args.debug or args.profile_out is not None, record=args.profile_out is not None)
+    hud = PerformanceHUD(profiler, pygame.font.SysFont('monospace', 14)) if args.debug else None
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    recorder = None
+    if args.record:
+        from replay import Recorder
+        recorder = Recorder(args.record, seed, config)
+    # Only the menu is set up here, worlds, sprites and the network are created when a mode is picked
+    game = Game(window, debug=args.debug, profiler=profiler, seed=seed, recorder=recorder, config=config)
+    startup.mark('game')
 
     running = True
-    while running:
-        dt = clock.tick(FPS) / 1000  # Amount of seconds between each loop
+    hud_rect = None
+    try:
+        while running:
+            if game.is_idle():
+                # Nothing moves on static screens, sleep until there is input (or wake up now and then for the network)
+                event = pygame.event.wait(IDLE_WAKE_INTERVAL)
+                if event.type != pygame.NOEVENT:
+                    pygame.event.post(event)
+            dt = clock.tick(config.fps) / 1000  # Amount of seconds between each loop
+            if recorder:
+                recorder.frame(dt)
+            for line in config.poll():
+                logger.info(line)
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            else:
-                game.handle_event(event)
+            with profiler.phase('events'):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
+                    else:
+                        if recorder and event.type == pygame.KEYDOWN:
+                            recorder.key(event.key)
+                        game.handle_event(event)
 
-        game.update(dt)
-        game.draw()
+            with profiler.phase('update'):
+                game.update(dt)
+            with profiler.phase('draw'):
+                dirty = game.draw()
+                if hud:
+                    # On an unchanged screen only the overlay is redrawn, over what was underneath it
+                    if dirty is not None and hud_rect:
+                        game.restore(hud_rect)
+                        dirty.append(hud_rect)
+                    hud_rect = hud.draw(window)
+                    if dirty is not None:
+                        dirty.append(hud_rect)
 
-        pygame.display.flip()
+            with profiler.phase('flip'):
+                if dirty is None:
+                    pygame.display.flip()
+                elif dirty:
+                    pygame.display.update(dirty)
+            profiler.end_frame()
+            if startup:
+                startup.mark('first frame')
+                logger.debug("First frame after %.1f ms", startup.total() * 1000)
+                if args.profile_startup:
+                    startup.report(args.profile_startup)
+                startup = None
+    finally:
+        # The game can also exit from inside handle_event, the timings are still written
+        if args.profile_out:
+            profiler.dump(args.profile_out)
+        if recorder:
+            recorder.close(game.state_digest())
 
     pygame.quit()
     sys.exit()
@@ -1,21 +1,78 @@
 import socket
-import pickle
+import threading
+import time
+from collections import deque
+from protocol import encode, decode, FrameDecoder, SnapshotHistory
+from settings import SNAPSHOT_BUFFER_SIZE
+from log import TRACE
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Network:
-    def __init__(self, host='localhost', port=5555):
+    def __init__(self, host='localhost', port=5555, clock=time.perf_counter, recorder=None):
         self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.client.connect((host, port))
-        print("Connected to server")
+        self.decoder = FrameDecoder()
+        self.snapshots = SnapshotHistory()
+        self.states = deque(maxlen=SNAPSHOT_BUFFER_SIZE)  # (receive time, full state) for interpolation
+        self.states_lock = threading.Lock()
+        self.clock = clock  # Timestamps received states
+        self.recorder = recorder  # Gets every received message, from whichever thread read it
+        self.connected = True
+        logger.info("Connected to server")
 
     def send(self, data):
-        self.client.sendall(pickle.dumps(data))
-        print(f"Sent data: {data}")
+        self.client.sendall(encode(data))
+        logger.log(TRACE, "Sent data: %s", data)
 
     def receive(self):
+        # Messages already buffered from an earlier recv are returned before reading again
+        while (payload := self.decoder.next_frame()) is None:
+            if not self.decoder.recv_into(self.client):
+                if self.connected:
+                    logger.info("Connection closed by server")
+                return None
+        if self.recorder:
+            self.recorder.message(payload)
+        data = decode(payload)
+        logger.log(TRACE, "Received data: %s", data)
+        return data
+
+    def start(self):
+        # After the handshake snapshots are received in the background, so a frame never waits on the server
+        receive_thread = threading.Thread(target=self.receive_loop, daemon=True)
+        receive_thread.start()
+
+    def receive_loop(self):
+        while self.connected:
+            try:
+                message = self.receive()
+            except Exception as e:
+                if self.connected:
+                    logger.error("Error receiving data: %s", e)
+                message = None
+            if message is None:
+                if self.connected and self.recorder:
+                    self.recorder.disconnect()  # Lost rather than closed by us
+                self.connected = False
+            elif message['type'] == 'snapshot':
+                self.apply_snapshot(message)
+
+    def apply_snapshot(self, message):
+        state = self.snapshots.apply(message)
+        if state is not None:
+            with self.states_lock:
+                self.states.append((self.clock(), state))
+
+    def buffered_states(self):
+        with self.states_lock:
+            return list(self.states)
+
+    def close(self):
+        self.connected = False
         try:
-            data = pickle.loads(self.client.recv(4096))
-            print(f"Received data: {data}")
-            return data
-        except EOFError as e:
-            print(f"Connection closed by server: {e}")
-            return None
\ No newline at end of file
+            self.client.shutdown(socket.SHUT_RDWR)  # Wakes the receive thread
+        except OSError:
+            pass
+        self.client.close()
\ No newline at end of file
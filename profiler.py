@@ -0,0 +1,104 @@
+import contextlib
+import time
+from collections import deque
+import pygame
+from enums import Colour
+from settings import PROFILE_WINDOW, HUD_REFRESH
+
+PHASES = ('events', 'update', 'network', 'draw', 'flip')  # network is the part of update spent talking to the server
+NO_PHASE = contextlib.nullcontext()
+
+class FrameProfiler:
+    # Per-phase frame timings, kept for the last PROFILE_WINDOW frames and optionally for the whole run
+    def __init__(self, enabled=True, record=False, window=PROFILE_WINDOW):
+        self.enabled = enabled
+        self.record = record  # Keep every frame for dump()
+        self.samples = {name: deque(maxlen=window) for name in PHASES + ('frame',)}
+        self.counters = {}  # Per-frame counts such as sprites drawn, reset every frame
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.frames = []
+        self.frame_start = None
+
+    def phase(self, name):
+        # Context manager timing one phase, a shared no-op when profiling is off
+        if not self.enabled:
+            return NO_PHASE
+        return self.timed(name)
+
+    @contextlib.contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[name] += time.perf_counter() - start
+
+    def count(self, name, value):
+        if self.enabled:
+            self.counters[name] = value
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.current['frame'] = now - self.frame_start  # Includes the wait in clock.tick
+            for name, seconds in self.current.items():
+                self.samples[name].append(seconds)
+            if self.record:
+                self.frames.append(dict(self.current, **self.counters))
+        self.frame_start = now
+        self.current = dict.fromkeys(PHASES, 0.0)
+
+    def percentiles(self, name, fractions=(0.5, 0.99)):
+        values = sorted(self.samples[name])
+        if not values:
+            return [0.0] * len(fractions)
+        return [values[min(len(values) - 1, int(len(values) * fraction))] for fraction in fractions]
+
+    def dump(self, path):
+        # CSV or JSON by extension, times in milliseconds
+        import csv
+        import json
+        rows = [{name: value * 1000 if name in self.samples else value for name, value in frame.items()} for frame in self.frames]
+        if path.endswith('.json'):
+            summary = {name: dict(zip(('p50', 'p99'), (value * 1000 for value in self.percentiles(name)))) for name in self.samples}
+            with open(path, 'w') as f:
+                json.dump({'summary_ms': summary, 'frames': rows}, f, indent=1)
+        else:
+            fields = list(dict.fromkeys(key for row in rows for key in row))
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows)
+
+class PerformanceHUD:
+    # Overlay with rolling p50/p99 per phase, re-rendered every HUD_REFRESH seconds rather than every frame
+    def __init__(self, profiler, font):
+        self.profiler = profiler
+        self.font = font
+        self.surface = None
+        self.last_refresh = 0.0
+
+    def refresh(self):
+        lines = []
+        frame_p50, frame_p99 = self.profiler.percentiles('frame')
+        lines.append(f"FPS {1 / frame_p50:.0f}  frame p50 {frame_p50 * 1000:.1f} p99 {frame_p99 * 1000:.1f} ms" if frame_p50 else "FPS -")
+        for name in PHASES:
+            p50, p99 = self.profiler.percentiles(name)
+            lines.append(f"{name:<8} p50 {p50 * 1000:5.2f}  p99 {p99 * 1000:5.2f} ms")
+        lines.extend(f"{name} {value}" for name, value in self.profiler.counters.items())
+
+        rendered = [self.font.render(line, True, Colour.WHITE) for line in lines]
+        height = self.font.get_linesize()
+        self.surface = pygame.Surface((max(text.get_width() for text in rendered) + 8, height * len(rendered) + 8), pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 160))
+        for i, text in enumerate(rendered):
+            self.surface.blit(text, (4, 4 + i * height))
+
+    def draw(self, window):
+        now = time.perf_counter()
+        if self.surface is None or now - self.last_refresh >= HUD_REFRESH:
+            self.refresh()
+            self.last_refresh = now
+        return window.blit(self.surface, (10, window.get_height() - self.surface.get_height() - 10))
@@ -0,0 +1,266 @@
+import json
+import struct
+from collections import OrderedDict
+
+PROTOCOL_VERSION = 4
+SNAPSHOT_HISTORY = 64  # Snapshots kept on each side so acked bases can still be found
+RECV_BUFFER_SIZE = 65536
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+MSG_WELCOME = 1
+MSG_SNAPSHOT = 2
+MSG_MOVE = 3
+
+FRAME_HEADER = struct.Struct('!I')  # Payload length
+MESSAGE_HEADER = struct.Struct('!BB')  # Protocol version, message type
+WELCOME = struct.Struct('!I')  # Player id, followed by the server's shared config as JSON
+SNAPSHOT_HEADER = struct.Struct('!IIfIHHIIH')  # Seq, base seq, match time left, winner, then the five section counts
+MOVE = struct.Struct('!Ifff')  # Acked seq, x, y, angle
+PLAYER = struct.Struct('!Ifff')  # Id, x, y, angle. Player ids are never reused, so they get 32 bits like asteroid ids
+PLAYER_ID = struct.Struct('!I')
+ASTEROID = struct.Struct('!IffH')  # Id, x, y, angle
+ASTEROID_ID = struct.Struct('!I')
+SCORE = struct.Struct('!IH')  # Player id, score
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def empty_state():
+    return {'players': {}, 'asteroids': {}, 'scores': {}, 'time_left': 0.0, 'winner': 0}
+
+
+def diff_states(base_state, state):
+    base_players = base_state['players']
+    players = {player_id: data for player_id, data in state['players'].items() if base_players.get(player_id) != data}
+    removed_players = [player_id for player_id in base_players if player_id not in state['players']]
+    base_scores = base_state['scores']
+    scores = {player_id: score for player_id, score in state['scores'].items() if base_scores.get(player_id) != score}
+    delta = {'players': players, 'removed_players': removed_players, 'scores': scores,
+             'time_left': state['time_left'], 'winner': state['winner']}
+
+    # Removed asteroids double as the pickup events, nothing else about an asteroid ever changes
+    base_asteroids = base_state['asteroids']
+    if state['asteroids'] is base_asteroids:
+        # Worlds that reuse their asteroid dict until it changes skip the scan entirely
+        delta['asteroids'], delta['removed_asteroids'] = {}, []
+    else:
+        delta['asteroids'] = {asteroid_id: data for asteroid_id, data in state['asteroids'].items() if asteroid_id not in base_asteroids}
+        delta['removed_asteroids'] = [asteroid_id for asteroid_id in base_asteroids if asteroid_id not in state['asteroids']]
+    return delta
+
+
+def apply_delta(base_state, delta):
+    # Entity dicts are replaced rather than mutated, so sections can be shared between states
+    players = dict(base_state['players'])
+    scores = dict(base_state['scores'])
+    for player_id in delta['removed_players']:
+        players.pop(player_id, None)
+        scores.pop(player_id, None)
+    players.update(delta['players'])
+    scores.update(delta['scores'])
+
+    # The asteroid dict is only copied when the field changed, so unchanged snapshots cost O(players)
+    asteroids = base_state['asteroids']
+    if delta['asteroids'] or delta['removed_asteroids']:
+        asteroids = dict(asteroids)
+        for asteroid_id in delta['removed_asteroids']:
+            asteroids.pop(asteroid_id, None)
+        asteroids.update(delta['asteroids'])
+    return {'players': players, 'asteroids': asteroids, 'scores': scores, 'time_left': delta['time_left'], 'winner': delta['winner']}
+
+
+def snapshot_message(seq, base_seq, base_state, state):
+    message = diff_states(base_state, state)
+    message.update(type='snapshot', seq=seq, base=base_seq)
+    return message
+
+
+def pack_entities(entities, entry):
+    # Record arrays from array_snapshot.py are already laid out as the entries
+    if hasattr(entities, 'tobytes'):
+        return entities.tobytes()
+    return b''.join(entry.pack(entity_id, data['pos'][0], data['pos'][1], data['angle']) for entity_id, data in entities.items())
+
+
+def pack_ids(ids, entry):
+    if hasattr(ids, 'tobytes'):
+        return ids.tobytes()
+    return b''.join(entry.pack(entity_id) for entity_id in ids)
+
+
+def encode(message):
+    kind = message['type']
+    if kind == 'welcome':
+        body = [MESSAGE_HEADER.pack(PROTOCOL_VERSION, MSG_WELCOME), WELCOME.pack(message['player_id']),
+                json.dumps(message['config']).encode()]
+    elif kind == 'move':
+        x, y = message['pos']
+        body = [MESSAGE_HEADER.pack(PROTOCOL_VERSION, MSG_MOVE), MOVE.pack(message['ack'], x, y, message['angle'])]
+    elif kind == 'snapshot':
+        body = [MESSAGE_HEADER.pack(PROTOCOL_VERSION, MSG_SNAPSHOT),
+                SNAPSHOT_HEADER.pack(message['seq'], message['base'], message['time_left'], message['winner'],
+                                     len(message['players']), len(message['removed_players']), len(message['scores']),
+                                     len(message['asteroids']), len(message['removed_asteroids']))]
+        body.append(pack_entities(message['players'], PLAYER))
+        body.append(pack_ids(message['removed_players'], PLAYER_ID))
+        for player_id, score in message['scores'].items():
+            body.append(SCORE.pack(player_id, score))
+        body.append(pack_entities(message['asteroids'], ASTEROID))
+        body.append(pack_ids(message['removed_asteroids'], ASTEROID_ID))
+    else:
+        raise ProtocolError(f"Unknown message type: {kind}")
+
+    payload = b''.join(body)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode(payload):
+    version, kind = MESSAGE_HEADER.unpack_from(payload)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}, expected {PROTOCOL_VERSION}")
+    offset = MESSAGE_HEADER.size
+
+    if kind == MSG_WELCOME:
+        player_id, = WELCOME.unpack_from(payload, offset)
+        try:
+            config = json.loads(bytes(payload[offset + WELCOME.size:]))
+        except ValueError as e:
+            raise ProtocolError(f"Malformed config in welcome: {e}") from None
+        return {'type': 'welcome', 'player_id': player_id, 'config': config}
+
+    if kind == MSG_MOVE:
+        ack, x, y, angle = MOVE.unpack_from(payload, offset)
+        return {'type': 'move', 'ack': ack, 'pos': (x, y), 'angle': angle}
+
+    if kind == MSG_SNAPSHOT:
+        (seq, base_seq, time_left, winner, player_count, removed_player_count, score_count,
+         asteroid_count, removed_asteroid_count) = SNAPSHOT_HEADER.unpack_from(payload, offset)
+        offset += SNAPSHOT_HEADER.size
+
+        players = {}
+        for player_id, x, y, angle in PLAYER.iter_unpack(payload[offset:offset + player_count * PLAYER.size]):
+            players[player_id] = {'pos': (x, y), 'angle': angle}
+        offset += player_count * PLAYER.size
+
+        removed_players = [player_id for player_id, in PLAYER_ID.iter_unpack(payload[offset:offset + removed_player_count * PLAYER_ID.size])]
+        offset += removed_player_count * PLAYER_ID.size
+
+        scores = dict(SCORE.iter_unpack(payload[offset:offset + score_count * SCORE.size]))
+        offset += score_count * SCORE.size
+
+        asteroids = {}
+        for asteroid_id, x, y, angle in ASTEROID.iter_unpack(payload[offset:offset + asteroid_count * ASTEROID.size]):
+            asteroids[asteroid_id] = {'pos': (x, y), 'angle': angle}
+        offset += asteroid_count * ASTEROID.size
+
+        removed_asteroids = [asteroid_id for asteroid_id, in ASTEROID_ID.iter_unpack(payload[offset:offset + removed_asteroid_count * ASTEROID_ID.size])]
+
+        return {'type': 'snapshot', 'seq': seq, 'base': base_seq, 'time_left': time_left, 'winner': winner,
+                'players': players, 'removed_players': removed_players, 'scores': scores,
+                'asteroids': asteroids, 'removed_asteroids': removed_asteroids}
+
+    raise ProtocolError(f"Unknown message type id: {kind}")
+
+
+class FrameDecoder:
+    # Reassembles frames from a byte stream in one reusable buffer, however TCP splits or merges them
+    def __init__(self, size=RECV_BUFFER_SIZE):
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # First unread byte
+        self.end = 0  # One past the last received byte
+        self.payload = None
+
+    def reserve(self, size):
+        # Make room for size more bytes after self.end, moving the unread tail to the front first
+        pending = self.end - self.start
+        if self.end + size <= len(self.buffer):
+            return
+        self.release_payload()
+        if pending + size <= len(self.buffer):
+            self.view[:pending] = self.view[self.start:self.end]
+        else:
+            # Only grows for frames bigger than the buffer, the old buffer is simply dropped
+            buffer = bytearray(max(len(self.buffer) * 2, pending + size))
+            buffer[:pending] = self.view[self.start:self.end]
+            self.view.release()
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+        self.start, self.end = 0, pending
+
+    def recv_into(self, sock):
+        # Returns the number of bytes read, 0 when the peer closed the connection
+        if self.start == self.end:
+            self.start = self.end = 0
+        self.reserve(1)
+        count = sock.recv_into(self.view[self.end:])
+        self.end += count
+        return count
+
+    def feed(self, data):
+        self.reserve(len(data))
+        self.view[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+    def release_payload(self):
+        if self.payload is not None:
+            self.payload.release()
+            self.payload = None
+
+    def next_frame(self):
+        # Payload of the next complete frame as a view into the buffer, valid until the next call
+        self.release_payload()
+        pending = self.end - self.start
+        if pending < FRAME_HEADER.size:
+            return None
+        length, = FRAME_HEADER.unpack_from(self.buffer, self.start)
+        if length > MAX_FRAME_SIZE:
+            raise ProtocolError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+        if pending < FRAME_HEADER.size + length:
+            self.reserve(FRAME_HEADER.size + length - pending)
+            return None
+        begin = self.start + FRAME_HEADER.size
+        self.start = begin + length
+        self.payload = self.view[begin:self.start]
+        return self.payload
+
+    def next_message(self):
+        payload = self.next_frame()
+        if payload is None:
+            return None
+        return decode(payload)
+
+    def messages(self):
+        while (message := self.next_message()) is not None:
+            yield message
+
+
+class SnapshotHistory:
+    def __init__(self, size=SNAPSHOT_HISTORY, empty=empty_state):
+        self.size = size
+        self.empty = empty  # Builds the state seq 0 stands for, array_snapshot has its own
+        self.snapshots = OrderedDict()
+        self.latest = 0
+
+    def add(self, seq, state):
+        self.snapshots[seq] = state
+        self.latest = seq
+        while len(self.snapshots) > self.size:
+            self.snapshots.popitem(last=False)
+
+    def get(self, seq):
+        # Seq 0 is the implicit empty state every client starts from
+        if seq == 0:
+            return self.empty()
+        return self.snapshots.get(seq)
+
+    def apply(self, message):
+        base_state = self.get(message['base'])
+        if base_state is None:
+            self.latest = 0  # Acking 0 makes the server fall back to a full snapshot
+            return None
+        state = apply_delta(base_state, message)
+        self.add(message['seq'], state)
+        return state
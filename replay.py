@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from collections import deque
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = 'hide'
+import pygame
+from game import Game
+from config import Config, ConfigError
+from network import Network
+from profiler import FrameProfiler, PHASES
+from protocol import decode, encode, SnapshotHistory
+from simulation import InputCommand
+from settings import WIDTH, HEIGHT, SNAPSHOT_BUFFER_SIZE
+
+# Session recordings. A recording is the seed and config the session started from followed by everything that was not
+# derived from them: frame times, key presses, the input of every simulation step and every message from the server. Records are
+# appended as they happen, so a recording can be streamed or cut short by a crash and still replay up to that point.
+# Replaying feeds them back through an unmodified Game without a window or a clock, as fast as the CPU allows, which
+# turns a real session into a repeatable CPU and frame time benchmark. The final state digest is checked against the
+# one recorded, so a replay also catches changes in behaviour.
+#
+#   file header   magic, format version, seed, config length, then the config as JSON
+#   records       one type byte, then a fixed body (a length and a protocol payload for messages)
+
+MAGIC = b'SMRC'
+RECORDING_VERSION = 2
+FILE_HEADER = struct.Struct('!4sBQH')  # Magic, format version, seed, length of the config that follows
+
+REC_FRAME = 1
+REC_KEY = 2
+REC_INPUT = 3
+REC_MESSAGE = 4
+REC_DISCONNECT = 5
+REC_END = 6
+
+RECORD_TYPE = struct.Struct('!B')
+RECORDS = {
+    REC_FRAME: struct.Struct('!d'),  # Frame time in seconds, exactly as the game got it
+    REC_KEY: struct.Struct('!i'),  # Key code of a key press
+    REC_INPUT: struct.Struct('!b'),  # Rotation of one simulation step
+    REC_MESSAGE: struct.Struct('!I'),  # Length of the protocol payload that follows
+    REC_DISCONNECT: struct.Struct(''),  # Server connection lost
+    REC_END: struct.Struct('!8s'),  # State digest when the session ended
+}
+
+
+class ReplayError(Exception):
+    pass
+
+
+class EndOfRecording(ReplayError):
+    pass
+
+
+class Recorder:
+    # Written from the main loop, and from the network thread for messages
+    def __init__(self, path, seed, config):
+        self.file = open(path, 'wb')
+        self.lock = threading.Lock()
+        settings = json.dumps(config.to_dict()).encode()  # As the session started, the replay runs with the same rules
+        self.file.write(FILE_HEADER.pack(MAGIC, RECORDING_VERSION, seed, len(settings)) + settings)
+
+    def write(self, kind, *values, payload=b''):
+        with self.lock:
+            if self.file.closed:
+                return  # The network thread can outlive the session
+            self.file.write(RECORD_TYPE.pack(kind) + RECORDS[kind].pack(*values) + payload)
+
+    def frame(self, dt):
+        self.write(REC_FRAME, dt)
+        with self.lock:
+            self.file.flush()  # Once per frame, so a crash loses at most the frame in progress
+
+    def key(self, key):
+        self.write(REC_KEY, key)
+
+    def input(self, command):
+        self.write(REC_INPUT, command.rotate)
+
+    def message(self, payload):
+        self.write(REC_MESSAGE, len(payload), payload=bytes(payload))
+
+    def disconnect(self):
+        self.write(REC_DISCONNECT)
+
+    def close(self, digest):
+        self.write(REC_END, digest)
+        with self.lock:
+            self.file.close()
+
+
+class Reader:
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        header = self.file.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise ReplayError(f"{path} is too short to be a recording")
+        magic, version, self.seed, config_length = FILE_HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ReplayError(f"{path} is not a recording")
+        if version != RECORDING_VERSION:
+            raise ReplayError(f"Unsupported recording version {version}, expected {RECORDING_VERSION}")
+        try:
+            self.config = Config(overrides=json.loads(self.file.read(config_length)), environ={})
+        except (ValueError, ConfigError) as e:
+            raise ReplayError(f"{path} has an unusable config: {e}") from None
+        self.pending = self.read_record()
+
+    def read_record(self):
+        # (type, value), or (None, None) at the end of the file, including after a record that was cut short
+        kind = self.file.read(RECORD_TYPE.size)
+        if not kind:
+            return None, None
+        kind, = RECORD_TYPE.unpack(kind)
+        body = RECORDS.get(kind)
+        if body is None:
+            raise ReplayError(f"Unknown record type {kind}")
+        data = self.file.read(body.size)
+        if len(data) < body.size:
+            return None, None
+        values = body.unpack(data)
+        if kind == REC_MESSAGE:
+            payload = self.file.read(values[0])
+            return (kind, payload) if len(payload) == values[0] else (None, None)
+        return kind, values[0] if values else None
+
+    def peek(self):
+        return self.pending[0]
+
+    def next(self):
+        record = self.pending
+        if record[0] is not None:
+            self.pending = self.read_record()
+        return record
+
+    def close(self):
+        self.file.close()
+
+
+class ReplayNetwork(Network):
+    # Stands in for the server connection, messages come from the recording instead of a socket
+    def __init__(self, reader, clock):
+        self.reader = reader
+        self.snapshots = SnapshotHistory()
+        self.states = deque(maxlen=SNAPSHOT_BUFFER_SIZE)
+        self.states_lock = threading.Lock()
+        self.clock = clock
+        self.recorder = None
+        self.connected = True
+        self.sent_bytes = 0
+
+    def send(self, data):
+        self.sent_bytes += len(encode(data))  # Still encoded, so the replay costs what the session did
+
+    def receive(self):
+        # Only used for the handshake, which reads synchronously before the receive thread starts
+        if self.reader.peek() != REC_MESSAGE:
+            return None
+        return decode(self.reader.next()[1])
+
+    def start(self):
+        pass  # Later messages are delivered by the replay loop at the point they were recorded
+
+    def deliver(self, payload):
+        message = decode(payload)
+        if message['type'] == 'snapshot':
+            self.apply_snapshot(message)
+
+    def close(self):
+        self.connected = False
+
+
+class ReplayGame(Game):
+    def __init__(self, window, reader, profiler=None):
+        self.reader = reader
+        self.time = 0.0  # Recorded session time, stands in for the wall clock
+        self.finished = False
+        self.recorded_digest = None
+        super().__init__(window, profiler=profiler, seed=reader.seed, config=reader.config)
+
+    def now(self):
+        return self.time
+
+    def connect(self, host, port):
+        return ReplayNetwork(self.reader, self.now)
+
+    def quit(self):
+        self.finished = True
+
+    def next_kind(self):
+        # Type of the next record of the main loop, after delivering the messages the receive thread got before it
+        while (kind := self.reader.peek()) in (REC_MESSAGE, REC_DISCONNECT):
+            _, payload = self.reader.next()
+            if not isinstance(self.network, ReplayNetwork):
+                continue  # Arrived after the session left multiplayer
+            if kind == REC_DISCONNECT:
+                self.network.connected = False
+            else:
+                self.network.deliver(payload)
+        return kind
+
+    def expect(self, expected):
+        kind = self.next_kind()
+        if kind is None:
+            raise EndOfRecording("Recording ends mid-frame")
+        if kind != expected:
+            raise ReplayError(f"Replay diverged: expected record type {expected}, found {kind}")
+        return self.reader.next()[1]
+
+    def read_input(self):
+        return InputCommand(self.expect(REC_INPUT))
+
+    def play_frame(self):
+        # Replays one main loop iteration, False once the recorded session is over
+        kind = self.next_kind()
+        if kind == REC_END:
+            self.recorded_digest = self.reader.next()[1]
+            return False
+        if kind is None:
+            return False
+        dt = self.expect(REC_FRAME)
+        self.time += dt
+
+        with self.profiler.phase('events'):
+            while self.next_kind() == REC_KEY:
+                self.handle_event(pygame.event.Event(pygame.KEYDOWN, key=self.reader.next()[1]))
+                if self.finished:
+                    return False
+        with self.profiler.phase('update'):
+            self.update(dt)
+        with self.profiler.phase('draw'):
+            dirty = self.draw()
+        with self.profiler.phase('flip'):
+            if dirty is None:
+                pygame.display.flip()
+            elif dirty:
+                pygame.display.update(dirty)
+        self.profiler.end_frame()
+        return True
+
+
+def replay(path, profiler, realtime=False):
+    reader = Reader(path)
+    window = pygame.display.set_mode((WIDTH, HEIGHT))
+    game = ReplayGame(window, reader, profiler)
+    frames = 0
+    start = time.perf_counter()
+    try:
+        while game.play_frame():
+            frames += 1
+            if realtime:
+                time.sleep(max(0.0, start + game.time - time.perf_counter()))
+        if game.finished and reader.peek() == REC_END:
+            game.recorded_digest = reader.next()[1]
+    except EndOfRecording:
+        pass  # A session that crashed, replayed as far as it was written
+    finally:
+        reader.close()
+    return {
+        'frames': frames,
+        'session_seconds': game.time,
+        'replay_seconds': time.perf_counter() - start,
+        'recorded_digest': game.recorded_digest,
+        'digest': game.state_digest(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session headlessly, as fast as possible")
+    parser.add_argument('recording', help='File written by main.py --record')
+    parser.add_argument('--show', action='store_true', help='Open a window and replay at the recorded speed instead')
+    parser.add_argument('--profile-out', metavar='PATH', help='Write per-frame phase timings to a .csv or .json file')
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))  # Assets are loaded relative to the project root
+    if not args.show:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    profiler = FrameProfiler(record=args.profile_out is not None, window=sys.maxsize)
+    try:
+        result = replay(args.recording, profiler, realtime=args.show)
+    except (OSError, ReplayError) as e:
+        print(f"Replay failed: {e}")
+        sys.exit(1)
+
+    print(f"{result['frames']} frames, {result['session_seconds']:.1f} s of play replayed in {result['replay_seconds']:.2f} s "
+          f"({result['session_seconds'] / max(result['replay_seconds'], 1e-9):.1f}x real time)")
+    print(f"{'phase':<8}{'p50 ms':>9}{'p99 ms':>9}")
+    for name in PHASES + ('frame',):
+        p50, p99 = profiler.percentiles(name)
+        print(f"{name:<8}{p50 * 1000:>9.3f}{p99 * 1000:>9.3f}")
+    if args.profile_out:
+        profiler.dump(args.profile_out)
+    pygame.quit()
+
+    if result['recorded_digest'] is None:
+        print("Recording has no end state, not compared")
+    elif result['recorded_digest'] == result['digest']:
+        print(f"End state matches the recording ({result['digest'].hex()})")
+    else:
+        print(f"End state differs: recorded {result['recorded_digest'].hex()}, replayed {result['digest'].hex()}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from server_settings import CLIENT_QUEUE_SIZE
+
+from server import GameServer
+from protocol import FrameDecoder, RECV_BUFFER_SIZE
+from config import Config
+
+class AsyncGameServer(GameServer):
+    def __init__(self, host='localhost', port=5555, config=None):
+        self.config = config or Config()
+        self.host = host
+        self.port = port
+        self.server = None
+        self.write_queues = {}  # Outgoing frames per client, bounded so a slow reader can't hold up the tick
+        self.init_world()
+
+    async def handle_client(self, reader, writer):
+        client_address = writer.get_extra_info('peername')
+        print(f"New connection: {client_address}")
+        player_id = self.add_player()
+
+        # Send player ID and the rules, the initial game state follows as a full snapshot on the next tick
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        queue.put_nowait(self.welcome(player_id))
+        self.write_queues[writer] = queue
+        self.add_client(writer, player_id)
+        write_task = asyncio.create_task(self.write_loop(writer, queue))
+
+        decoder = FrameDecoder()
+        try:
+            while self.running:
+                data = await reader.read(RECV_BUFFER_SIZE)
+                if not data:
+                    break
+                decoder.feed(data)
+                for action in decoder.messages():
+                    self.inputs.put((writer, player_id, action))
+        except ConnectionError:
+            pass
+        except Exception as e:
+            print(f"Error handling client {player_id}: {e}")
+
+        print(f"Connection closed: {client_address}")
+        write_task.cancel()
+        self.write_queues.pop(writer, None)
+        self.remove_player(writer, player_id)
+        writer.close()
+
+    async def write_loop(self, writer, queue):
+        try:
+            while True:
+                data = await queue.get()
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError as e:
+            print(f"Error sending data to client: {e}")
+
+    def send_snapshot(self, client, data):
+        queue = self.write_queues.get(client)
+        if queue is None:
+            return False
+        if queue.full():
+            # Deltas are always against the client's last ack, so dropping the oldest unsent snapshot is safe
+            queue.get_nowait()
+        queue.put_nowait(data)
+        return True
+
+    async def tick_loop(self):
+        next_tick = self.last_report = time.perf_counter()
+        while self.running:
+            next_tick = self.timed_tick(next_tick)
+            await asyncio.sleep(max(0, next_tick - time.perf_counter()))
+
+    async def serve(self, ready=None):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        print(f"Server started on {self.host}:{self.port} (asyncio)")
+        if ready:
+            ready()
+        async with self.server:
+            await self.tick_loop()
+
+    def run(self, ready=None):
+        asyncio.run(self.serve(ready))
+
+    def shutdown(self):
+        self.running = False
+        for writer in list(self.write_queues):
+            writer.close()
+        if self.server:
+            self.server.close()
\ No newline at end of file
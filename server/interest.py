@@ -0,0 +1,49 @@
+import numpy as np
+from protocol import SnapshotHistory, encode
+from array_snapshot import PLAYER_RECORD, ASTEROID_RECORD, empty_state, snapshot_message
+from settings import WIDTH, HEIGHT
+
+# Per-client area of interest. Each client only gets the entities around its own player, so its snapshots stay
+# the same size however big the world gets. Entities entering the area arrive as additions in the next delta,
+# ones leaving it (or collected) as removals.
+
+class ClientView:
+    def __init__(self, player_id, config):
+        self.player_id = player_id
+        self.config = config  # interest_margin is read every tick, so a reloaded value applies straight away
+        self.snapshots = SnapshotHistory(empty=empty_state)  # Filtered states sent to this client, deltas go against its acks
+        self.area = None
+        self.world_asteroids = None  # World asteroid records self.asteroids was filtered from
+        self.asteroids = empty_state()['asteroids']
+
+    def filter(self, world, state):
+        # The world's players must have been indexed with index_players this tick
+        slot = world.players.slots.get(self.player_id)
+        if slot is None:
+            return dict(empty_state(), time_left=state['time_left'], winner=state['winner'])
+        margin = self.config.interest_margin  # The camera is centred on the player, see Player.update
+        area = world.cell_area(float(world.players.x[slot]), float(world.players.y[slot]), WIDTH / 2 + margin, HEIGHT / 2 + margin)
+
+        # Asteroids are refiltered only when the area moves into new cells or something was collected, and the
+        # previous records are kept if the ids are the same so unchanged ticks skip the asteroid diff
+        if area != self.area or state['asteroids'] is not self.world_asteroids:
+            asteroids = world.asteroids.records(world.asteroids_in(area), ASTEROID_RECORD)
+            if not np.array_equal(asteroids['id'], self.asteroids['id']):
+                self.asteroids = asteroids
+            self.area = area
+            self.world_asteroids = state['asteroids']
+
+        players = world.players.records(world.players_in(area), PLAYER_RECORD)
+        world_scores = state['scores']
+        scores = {player_id: world_scores[player_id] for player_id in players['id'].tolist() if player_id in world_scores}
+        return {'players': players, 'asteroids': self.asteroids, 'scores': scores,
+                'time_left': state['time_left'], 'winner': state['winner']}
+
+    def snapshot(self, world, state, seq, ack):
+        # Encoded snapshot of what this client sees, against the last state it acked or the empty one once that is gone
+        visible = self.filter(world, state)
+        self.snapshots.add(seq, visible)
+        base_state = self.snapshots.get(ack)
+        if base_state is None:
+            ack, base_state = 0, self.snapshots.get(0)
+        return encode(snapshot_message(seq, ack, base_state, visible))
@@ -1,82 +1,277 @@
 import socket
-import pickle
 import threading
+import queue
+import time
 import sys
 import os
 import signal
-from server_settings import ASTEROID_COUNT
+import argparse
+import gc
+import math
+from server_settings import TICK_STATS_INTERVAL, WORKER_COUNT, MAX_PLAYERS_PER_ROOM, MOVE_TOLERANCE, MAX_MOVE_INTERVAL
 
-from asteroid_server import Asteroid
+# The wire protocol is shared with the client, which lives one directory up
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from startup import StartupTimer
+from protocol import encode, FrameDecoder
+from config import Config, add_arguments, from_args
+from settings import FPS
 
 class GameServer:
-    def __init__(self, host='localhost', port=5555):
+    def __init__(self, host='localhost', port=5555, config=None):
+        self.config = config or Config()
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server.settimeout(1.0)  # Set a timeout for the accept call
         self.server.bind((host, port))
         self.server.listen()
         print(f"Server started on {host}:{port}")
+        self.init_world()
 
+    def init_world(self):
         self.clients = []
+        self.last_player_id = 0  # Ids are never reused so deltas can't confuse two players
+        self.acks = {}  # Last snapshot seq each client has confirmed
+        self.move_times = {}  # When each player's last move was accepted, bounds how far the next one may go
+        self.views = {}  # What each client can see and the snapshots it was sent
+        self.seq = 0
+        self.snapshot_credit = 0  # Spreads snapshot_rate snapshots over tick_rate ticks, see snapshot_due
+        self.inputs = queue.Queue()  # Client actions waiting for the next tick
+        self.state_lock = threading.Lock()
+        self.tick_stats = {'ticks': 0, 'overruns': 0, 'last_duration': 0.0, 'max_duration': 0.0, 'total_duration': 0.0}
         self.running = True
         
-        self.game_state = {
-            'players': {},
-            'asteroids': [Asteroid().serialize() for _ in range(ASTEROID_COUNT)]
-        }
+        self.world = self.create_world()
+
+    def create_world(self):
+        from entity_store import ArrayWorld  # numpy, which the sharded front door never needs
+        config = self.config
+        world = ArrayWorld(config.game_width, config.game_height, speed=config.player_speed, rotate_speed=config.player_rotate_speed)
+        self.start_match(world)
+        return world
+
+    def start_match(self, world):
+        world.clear_asteroids()
+        world.spawn_asteroids(self.config.asteroid_count)
+        for player_id in world.scores:
+            world.scores[player_id] = 0
+        self.match_start = time.perf_counter()
+        self.match_end = None  # Set once someone wins or the time runs out
+        self.winner = 0
+        world.to_state()  # Serializes the new field now rather than in the first tick of the match
+
+    def time_left(self):
+        end = self.match_end if self.match_end is not None else time.perf_counter()
+        return max(0.0, self.config.time_limit - (end - self.match_start))
+
+    def update_match(self, pickups):
+        now = time.perf_counter()
+        if not len(self.world.players):
+            self.match_start = now  # The clock only runs while someone is playing
+            return
+        if self.match_end is not None:
+            if now - self.match_end >= self.config.match_restart_delay:
+                print("Starting a new match")
+                self.start_match(self.world)
+            return
+
+        for player_id, _ in pickups:
+            if self.world.scores.get(player_id, 0) >= self.config.asteroid_win_count:
+                self.winner = player_id
+                break
+        if self.winner or now - self.match_start >= self.config.time_limit:
+            self.match_end = now
+            print(f"Match over, winner: {self.winner or 'nobody'}")
 
     def handle_client(self, client_socket, client_address):
         print(f"New connection: {client_address}")
-        self.clients.append(client_socket)
-        player_id = len(self.clients)
-        self.game_state['players'][player_id] = {'pos': (0, 0), 'angle': 0}
+        player_id = self.add_player()
 
         try:
-            # Send player ID
-            client_socket.sendall(pickle.dumps(player_id))
-
-            # Send initial game state to the new client
-            client_socket.sendall(pickle.dumps(self.game_state))
+            # Send player ID and the rules, the initial game state follows as a full snapshot on the next tick
+            client_socket.sendall(self.welcome(player_id))
+            self.add_client(client_socket, player_id)
         except Exception as e:
             print(f"Error sending initial game state to player {player_id}: {e}")
 
+        decoder = FrameDecoder()
         while self.running:
             try:
-                data = client_socket.recv(4096)
-                if not data:
+                if not decoder.recv_into(client_socket):
                     break
-                action = pickle.loads(data)
-                if action['type'] == 'move':
-                    self.game_state['players'][player_id]['pos'] = action['pos']
-
-                self.broadcast_game_state()
+                for action in decoder.messages():
+                    self.inputs.put((client_socket, player_id, action))
             except Exception as e:
                 print(f"Error handling client {player_id}: {e}")
                 break
 
         print(f"Connection closed: {client_address}")
-        self.clients.remove(client_socket)
-        del self.game_state['players'][player_id]
+        self.remove_player(client_socket, player_id)
         client_socket.close()
 
+    def welcome(self, player_id):
+        return encode({'type': 'welcome', 'player_id': player_id, 'config': self.config.shared()})
+
+    def add_player(self):
+        with self.state_lock:
+            self.last_player_id += 1
+            player_id = self.last_player_id
+            self.world.add_player(player_id)
+        return player_id
+
+    def add_client(self, client, player_id):
+        from interest import ClientView  # numpy, like create_world
+        with self.state_lock:
+            self.acks[client] = 0
+            self.views[client] = ClientView(player_id, self.config)
+            self.clients.append(client)
+
+    def remove_player(self, client, player_id):
+        with self.state_lock:
+            if client in self.clients:
+                self.clients.remove(client)
+            self.acks.pop(client, None)
+            self.views.pop(client, None)
+            self.move_times.pop(player_id, None)
+            self.world.remove_player(player_id)
+            if not len(self.world.players):
+                self.start_match(self.world)  # Whoever joins next gets a fresh field
+
+    def send_snapshot(self, client, data):
+        try:
+            client.sendall(data)
+            return True
+        except Exception as e:
+            print(f"Error sending data to client: {e}")
+            return False
+
+    def step_world(self):
+        # Drain everything that arrived since the last tick, later moves overwrite earlier ones
+        moved = set()
+        while True:
+            try:
+                client_socket, player_id, action = self.inputs.get_nowait()
+            except queue.Empty:
+                break
+            if action['type'] == 'move' and player_id in self.world.players:
+                move = self.check_move(player_id, action)
+                if move is None:
+                    continue
+                self.world.set_player(player_id, *move)
+                self.acks[client_socket] = action['ack']
+                moved.add(player_id)
+
+        # Pickups are resolved here rather than trusted from clients, against the same sizes the client uses
+        pickups = self.world.pickup(moved) if self.match_end is None else []
+        self.update_match(pickups)
+
+    def check_move(self, player_id, action):
+        # Returns the (pos, angle) to store, None for a move to drop. Positions are clamped to the world and to how far
+        # the player could have flown since its last accepted move, so a client can't teleport onto asteroids.
+        (x, y), angle = action['pos'], action['angle']
+        if not (math.isfinite(x) and math.isfinite(y) and math.isfinite(angle)):
+            return None
+        now = time.perf_counter()
+        elapsed = now - self.move_times.get(player_id, now - 1 / self.config.tick_rate)
+        elapsed = min(max(elapsed, 1 / self.config.tick_rate), MAX_MOVE_INTERVAL)
+        reach = self.config.player_speed * FPS * elapsed * MOVE_TOLERANCE
+        last_x, last_y = self.world.player_pos(player_id)
+        distance = math.hypot(x - last_x, y - last_y)
+        if distance > reach:
+            x, y = last_x + (x - last_x) * reach / distance, last_y + (y - last_y) * reach / distance
+        x = min(max(x, 10), self.world.width - 10)  # The same bounds the simulation bounces off
+        y = min(max(y, 10), self.world.height - 10)
+        self.move_times[player_id] = now
+        return (x, y), angle % 360
+
     def broadcast_game_state(self):
-        serialized_state = pickle.dumps(self.game_state)
+        if not self.clients:
+            return
+        self.seq += 1
+        state = self.world.to_state()
+        state['time_left'] = self.time_left()
+        state['winner'] = self.winner
+        self.world.index_players()
+
+        # Every client gets its own filtered state, diffed against the last one it acked
         disconnected_clients = []
         for client in self.clients:
-            try:
-                client.sendall(serialized_state)
-            except Exception as e:
-                print(f"Error sending data to client: {e}")
+            data = self.views[client].snapshot(self.world, state, self.seq, self.acks.get(client, 0))
+            if not self.send_snapshot(client, data):
                 disconnected_clients.append(client)
 
         # Remove disconnected clients
         for client in disconnected_clients:
             self.clients.remove(client)
+            self.acks.pop(client, None)
+            self.views.pop(client, None)
+
+    def snapshot_due(self):
+        # True on snapshot_rate of every tick_rate ticks, evenly spaced; every tick when snapshots are as frequent
+        tick_rate = self.config.tick_rate
+        self.snapshot_credit = min(self.snapshot_credit + self.config.snapshot_rate, tick_rate)
+        if self.snapshot_credit < tick_rate:
+            return False
+        self.snapshot_credit -= tick_rate
+        return True
+
+    def tick(self):
+        with self.state_lock:
+            self.step_world()
+            if self.snapshot_due():
+                self.broadcast_game_state()
+
+    def timed_tick(self, next_tick):
+        # Runs one tick and returns when the next one is due
+        start = time.perf_counter()
+        try:
+            self.tick()
+        except Exception as e:
+            # One bad client or state must not stop the simulation for everyone else
+            print(f"Tick failed: {e!r}")
+        now = time.perf_counter()
+        duration = now - start
+
+        stats = self.tick_stats
+        stats['ticks'] += 1
+        stats['last_duration'] = duration
+        stats['max_duration'] = max(stats['max_duration'], duration)
+        stats['total_duration'] += duration
 
-    def run(self):
-        self.game_state = {
-            'players': {},
-            'asteroids': [Asteroid().serialize() for _ in range(ASTEROID_COUNT)]
-        }
+        next_tick += 1 / self.config.tick_rate
+        if now > next_tick:
+            # Saturated: count it and start the schedule again instead of bursting to catch up
+            stats['overruns'] += 1
+            next_tick = now
+
+        if now - self.last_report >= TICK_STATS_INTERVAL:
+            self.report_tick_stats()
+            self.last_report = now
+        self.poll_config()
+        return next_tick
+
+    def poll_config(self):
+        # Tuning knobs changed in the config file apply from the next tick
+        for line in self.config.poll():
+            print(line)
+
+    def tick_loop(self):
+        next_tick = self.last_report = time.perf_counter()
+        while self.running:
+            next_tick = self.timed_tick(next_tick)
+            time.sleep(max(0, next_tick - time.perf_counter()))
+
+    def report_tick_stats(self):
+        stats = self.tick_stats
+        average = stats['total_duration'] / stats['ticks'] * 1000 if stats['ticks'] else 0
+        print(f"Tick {stats['ticks']}: avg {average:.2f} ms, max {stats['max_duration'] * 1000:.2f} ms, "
+              f"overruns {stats['overruns']}, budget {1000 / self.config.tick_rate:.2f} ms, clients {len(self.clients)}")
+
+    def run(self, ready=None):
+        # ready is called once players can connect
+        tick_thread = threading.Thread(target=self.tick_loop, daemon=True)
+        tick_thread.start()
+        if ready:
+            ready()
         while self.running:
             try:
                 client_socket, client_address = self.server.accept()
@@ -89,12 +284,47 @@ class GameServer:
 
     def shutdown(self):
         self.running = False
-        for client in self.clients:
+        for client in list(self.clients):
+            try:
+                client.shutdown(socket.SHUT_RDWR)  # Wakes the client thread blocked in recv, close alone doesn't
+            except OSError:
+                pass
             client.close()
         self.server.close()
 
 if __name__ == "__main__":
-    server = GameServer()
+    parser = argparse.ArgumentParser(description="Space Miner Server")
+    parser.add_argument('--host', default='localhost', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=5555, help='Port to listen on')
+    parser.add_argument('--mode', choices=['threaded', 'async', 'sharded'], default='threaded',
+                        help='Thread per connection, a single asyncio event loop, or rooms spread over worker processes')
+    parser.add_argument('--workers', type=int, default=WORKER_COUNT, help='Worker processes in sharded mode')
+    parser.add_argument('--max-players', type=int, default=MAX_PLAYERS_PER_ROOM, help='Players per room in sharded mode')
+    parser.add_argument('--profile-startup', metavar='PATH', nargs='?', const='-',
+                        help='Report time spent per startup phase until the server accepts players, as JSON when given a path')
+    add_arguments(parser)
+    args = parser.parse_args()
+    config = from_args(parser, args)
+    startup = StartupTimer()
+    startup.mark('imports')
+
+    if args.mode == 'async':
+        from async_server import AsyncGameServer
+        server = AsyncGameServer(args.host, args.port, config)
+    elif args.mode == 'sharded':
+        from sharded_server import ShardedServer
+        server = ShardedServer(args.host, args.port, args.workers, args.max_players, config)
+    else:
+        server = GameServer(args.host, args.port, config)
+    startup.mark('server')
+    # Modules and the first world live as long as the process, keep the collector from rescanning them. Only done once,
+    # frozen objects are never collected.
+    gc.freeze()
+
+    def ready():
+        startup.mark('listening')
+        if args.profile_startup:
+            startup.report(args.profile_startup)
 
     def signal_handler(sig, frame):
         print("Shutting down server...")
@@ -102,5 +332,6 @@ if __name__ == "__main__":
         sys.exit(0)
 
     signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
 
-    server.run()
\ No newline at end of file
+    server.run(ready)
\ No newline at end of file
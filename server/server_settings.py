@@ -1,8 +1,9 @@
-GAMESPACE_WIDTH, GAMESPACE_HEIGHT = 600, 600
-GAME_SIZE_MULTIPLIER = 4
-ASTEROID_DENSITY = 0.00001
+# Process level server settings. World size, rules and the tuning knobs are part of the shared config, see config.py.
 
-GAME_WIDTH = GAMESPACE_WIDTH * GAME_SIZE_MULTIPLIER
-GAME_HEIGHT = GAMESPACE_HEIGHT * GAME_SIZE_MULTIPLIER
-
-ASTEROID_COUNT = int(GAME_WIDTH * GAME_HEIGHT * ASTEROID_DENSITY)
\ No newline at end of file
+TICK_STATS_INTERVAL = 10  # Seconds between tick duration/overrun reports
+MOVE_TOLERANCE = 1.5  # Client moves may cover this many times the distance the elapsed time allows, for frame jitter
+MAX_MOVE_INTERVAL = 0.25  # Seconds of movement a single move can make up for, so an idle client can't bank a jump
+CLIENT_QUEUE_SIZE = 8  # Snapshots buffered per client in async mode before the oldest is dropped
+WORKER_COUNT = 4  # Worker processes in sharded mode, each running its own rooms
+MAX_PLAYERS_PER_ROOM = 8
+LOAD_REPORT_INTERVAL = 5  # Seconds between per-worker load reports in sharded mode
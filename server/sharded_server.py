@@ -0,0 +1,209 @@
+import gc
+import json
+import multiprocessing
+import signal
+import socket
+import threading
+import time
+from server_settings import WORKER_COUNT, MAX_PLAYERS_PER_ROOM, LOAD_REPORT_INTERVAL
+
+from server import GameServer
+from config import Config
+from settings import CONFIG_POLL_INTERVAL
+
+# Front door plus worker processes. The front door only accepts connections and picks a room for each one; the
+# socket itself is passed to the worker running that room, which serves it until it disconnects. Every worker is a
+# separate process with its own GIL, running any number of independent rooms (matches with their own asteroid field).
+# Front door and workers talk over a Unix SOCK_SEQPACKET pair: joins (with the client fd attached) one way, leave
+# notifications and load reports the other, one JSON message per packet. A room that empties out is retired: the
+# front door forgets it and tells its worker to stop ticking it, room ids are never reused.
+
+class RoomServer(GameServer):
+    # A GameServer without a listening socket, its clients are handed over by the worker
+    def __init__(self, room_id, on_leave, config):
+        self.config = config
+        self.room_id = room_id
+        self.on_leave = on_leave
+        self.init_world()
+        threading.Thread(target=self.tick_loop, daemon=True).start()
+
+    def handle_client(self, client_socket, client_address):
+        super().handle_client(client_socket, client_address)
+        self.on_leave(self.room_id)
+
+    def report_tick_stats(self):
+        pass  # The worker reports for all of its rooms at once
+
+    def poll_config(self):
+        pass  # The rooms of a worker share its config, which the worker reloads
+
+class Worker:
+    def __init__(self, worker_id, channel, config):
+        self.worker_id = worker_id
+        self.channel = channel
+        self.config = config
+        self.rooms = {}
+        self.send_lock = threading.Lock()
+
+    def send(self, message):
+        with self.send_lock:
+            self.channel.send(json.dumps(message).encode())
+
+    def on_leave(self, room_id):
+        self.send({'type': 'leave', 'room': room_id})
+
+    def run(self):
+        threading.Thread(target=self.report_loop, daemon=True).start()
+        threading.Thread(target=self.config_loop, daemon=True).start()
+        while True:
+            data, fds, _, _ = socket.recv_fds(self.channel, 4096, 1)
+            if not data:
+                break  # The front door has gone away
+            message = json.loads(data)
+            if message['type'] == 'retire':
+                room = self.rooms.pop(message['room'], None)
+                if room is not None:
+                    room.running = False  # Ends its tick loop, its clients have all left
+                continue
+            client = socket.socket(fileno=fds[0])
+            client.setblocking(True)
+            room = self.rooms.get(message['room'])
+            if room is None:
+                room = self.rooms[message['room']] = RoomServer(message['room'], self.on_leave, self.config)
+            threading.Thread(target=room.handle_client, args=(client, tuple(message['address'])), daemon=True).start()
+
+    def report_loop(self):
+        last_cpu, last_time = time.process_time(), time.perf_counter()
+        while True:
+            time.sleep(LOAD_REPORT_INTERVAL)
+            cpu, now = time.process_time(), time.perf_counter()
+            rooms = list(self.rooms.values())
+            ticks = sum(room.tick_stats['ticks'] for room in rooms)
+            self.send({
+                'type': 'load',
+                'worker': self.worker_id,
+                'rooms': {room.room_id: len(room.clients) for room in rooms},
+                'cpu_percent': (cpu - last_cpu) / (now - last_time) * 100,
+                'tick_ms': sum(room.tick_stats['total_duration'] for room in rooms) / ticks * 1000 if ticks else 0,
+                'max_tick_ms': max((room.tick_stats['max_duration'] for room in rooms), default=0) * 1000,
+                'overruns': sum(room.tick_stats['overruns'] for room in rooms),
+            })
+            last_cpu, last_time = cpu, now
+
+    def config_loop(self):
+        while True:
+            time.sleep(CONFIG_POLL_INTERVAL)
+            for line in self.config.poll():
+                print(f"Worker {self.worker_id}: {line}")
+
+def run_worker(worker_id, channel, config):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C goes to the whole process group, the front door stops workers
+    import entity_store  # Loaded up front so the first room doesn't wait for numpy
+    gc.freeze()  # Once, for the modules, rooms come and go and must stay collectable
+    Worker(worker_id, channel, config).run()
+
+class ShardedServer:
+    def __init__(self, host='localhost', port=5555, workers=WORKER_COUNT, max_players=MAX_PLAYERS_PER_ROOM, config=None):
+        self.config = config or Config()  # Pickled to every worker, which each watch the config file themselves
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.settimeout(1.0)  # Set a timeout for the accept call
+        self.server.bind((host, port))
+        self.server.listen()
+        print(f"Server started on {host}:{port} ({workers} workers, {max_players} players per room)")
+        self.worker_count = workers
+        self.max_players = max_players
+        self.workers = []  # (process, channel) by worker id
+        self.rooms = {}  # Room id -> {'worker': worker id, 'players': count}
+        self.last_room_id = 0
+        self.lock = threading.Lock()
+        self.running = True
+
+    def start_workers(self):
+        for worker_id in range(self.worker_count):
+            channel, worker_channel = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            # Spawned rather than forked so workers don't inherit the listening socket or each other's channels
+            process = multiprocessing.get_context('spawn').Process(target=run_worker, args=(worker_id, worker_channel, self.config), daemon=True)
+            process.start()
+            worker_channel.close()
+            self.workers.append((process, channel))
+            threading.Thread(target=self.read_reports, args=(worker_id, channel), daemon=True).start()
+
+    def allocate_room(self):
+        # Fill existing rooms first, new rooms go to the worker with the fewest players
+        with self.lock:
+            for room_id, room in self.rooms.items():
+                if room['players'] < self.max_players:
+                    break
+            else:
+                load = {worker_id: 0 for worker_id in range(len(self.workers))}
+                for room in self.rooms.values():
+                    load[room['worker']] += room['players']
+                self.last_room_id += 1
+                room_id = self.last_room_id
+                room = self.rooms[room_id] = {'worker': min(load, key=load.get), 'players': 0}
+            room['players'] += 1
+            return room_id, room['worker']
+
+    def hand_off(self, client_socket, client_address):
+        room_id, worker_id = self.allocate_room()
+        message = json.dumps({'type': 'join', 'room': room_id, 'address': list(client_address)}).encode()
+        try:
+            socket.send_fds(self.workers[worker_id][1], [message], [client_socket.fileno()])
+        except OSError as e:
+            print(f"Could not hand {client_address} to worker {worker_id}: {e}")
+            self.release_seat(room_id)  # The worker never got the client, so no leave will come for it
+            return
+        finally:
+            client_socket.close()  # The worker has its own copy of the descriptor now, if it got one
+        print(f"Handing {client_address} to room {room_id} on worker {worker_id}")
+
+    def release_seat(self, room_id):
+        # Retires the room once its last player is gone, allocate_room can't pick it after it leaves self.rooms
+        with self.lock:
+            room = self.rooms[room_id]
+            room['players'] -= 1
+            if room['players']:
+                return
+            del self.rooms[room_id]
+        try:
+            self.workers[room['worker']][1].send(json.dumps({'type': 'retire', 'room': room_id}).encode())
+        except OSError:
+            pass  # The worker is gone, and its rooms with it
+        print(f"Retired room {room_id} on worker {room['worker']}")
+
+    def read_reports(self, worker_id, channel):
+        while self.running:
+            try:
+                data = channel.recv(4096)
+            except OSError:
+                break
+            if not data:
+                print(f"Worker {worker_id} exited")
+                break
+            message = json.loads(data)
+            if message['type'] == 'leave':
+                self.release_seat(message['room'])
+            elif message['type'] == 'load':
+                rooms = message['rooms']
+                print(f"Worker {worker_id}: {sum(rooms.values())} players in {len(rooms)} rooms, cpu {message['cpu_percent']:.1f}%, "
+                      f"tick avg {message['tick_ms']:.2f} ms, max {message['max_tick_ms']:.2f} ms, overruns {message['overruns']}")
+
+    def run(self, ready=None):
+        self.start_workers()
+        if ready:
+            ready()
+        while self.running:
+            try:
+                client_socket, client_address = self.server.accept()
+                self.hand_off(client_socket, client_address)
+            except socket.timeout:
+                continue
+            except Exception as e:
+                print(f"Server error: {e}")
+
+    def shutdown(self):
+        self.running = False
+        for process, channel in self.workers:
+            channel.close()
+            process.terminate()
+        self.server.close()
@@ -1,12 +1,21 @@
 WIDTH, HEIGHT = 600, 600
 GAME_SIZE_MULTIPLIER = 4
 FPS = 60
+SIMULATION_RATE = 60  # Fixed simulation steps per second, independent of the frame rate
+SIMULATION_STEP = 1 / SIMULATION_RATE
+MAX_CATCH_UP_STEPS = 5  # Steps run in one frame at most, anything beyond is dropped
+IDLE_WAKE_INTERVAL = 100  # Milliseconds the loop sleeps on static screens when no input arrives
 STAR_DENSITY = 0.0002
+BACKGROUND_CHUNK_SIZE = 300  # Starfield tiles are generated and cached at this size
+BACKGROUND_CACHE_SIZE = 32  # Tiles kept before the least recently viewed is dropped
 
 PLAYER_SPEED = 5
 PLAYER_ROTATE_SPEED = 5
 PLAYER_HEIGHT = 28
 PLAYER_WIDTH = 28
+TRAIL_LENGTH = 13  # Exhaust trail segments, one per frame
+TRAIL_MIN_RADIUS = 2  # Oldest segment
+TRAIL_MAX_RADIUS = 7  # Segment closest to the player
 
 ASTEROID_DENSITY = 0.00001
 ASTEROID_WIN_COUNT = 20
@@ -17,4 +26,31 @@ TIME_LIMIT = 30  # in seconds
 
 # Game space dimensions
 GAME_WIDTH, GAME_HEIGHT = WIDTH * GAME_SIZE_MULTIPLIER, HEIGHT * GAME_SIZE_MULTIPLIER
-ASTEROID_COUNT = int(GAME_WIDTH * GAME_HEIGHT * ASTEROID_DENSITY)
\ No newline at end of file
+ASTEROID_COUNT = int(GAME_WIDTH * GAME_HEIGHT * ASTEROID_DENSITY)
+
+# Server tuning, defaults for the config the server runs with (see config.py)
+TICK_RATE = 60  # Server simulation ticks per second
+SNAPSHOT_RATE = 60  # Snapshots per second to each client, at most one per tick
+INTEREST_MARGIN = 200  # Pixels around the client view whose entities are still sent
+MATCH_RESTART_DELAY = 5  # Seconds the result stays up before the next match starts
+
+# Config
+CONFIG_ENV_PREFIX = 'SPACEMINER_'  # SPACEMINER_TICK_RATE=30 overrides tick_rate
+CONFIG_POLL_INTERVAL = 1.0  # Seconds between checks of the config file for changes
+
+# Multiplayer
+INTERPOLATION_DELAY = 0.1  # Remote players are drawn this many seconds in the past, between two snapshots
+SNAPSHOT_BUFFER_SIZE = 32
+
+# Assets
+ASSET_CACHE_SIZE = 512  # Scaled/rotated surfaces kept before the least recently used is evicted
+ROTATION_STEPS = 72  # Rocket sprites are pre-rotated in 360 / ROTATION_STEPS degree steps
+TEXT_CACHE_SIZE = 256  # Rendered text surfaces kept, menu labels plus the changing score and timer
+
+# Spatial index
+SPATIAL_CELL_SIZE = 100  # Grid cell size for collision and view queries, a few sprites across
+VIEW_MARGIN = 100  # Extra space around the view when culling players, so their tails still get drawn
+
+# Profiling
+PROFILE_WINDOW = 300  # Frames the rolling percentiles are taken over
+HUD_REFRESH = 0.5  # Seconds between performance overlay updates
\ No newline at end of file
@@ -0,0 +1,142 @@
+import math
+import random
+from settings import GAME_WIDTH, GAME_HEIGHT, FPS, PLAYER_SPEED, PLAYER_ROTATE_SPEED, PLAYER_HEIGHT, PLAYER_WIDTH
+from settings import ASTEROID_HEIGHT, ASTEROID_WIDTH, SPATIAL_CELL_SIZE
+from spatial import SpatialHash
+
+# Game rules without pygame: the client renders from this state and the server can run it without a display.
+# Speeds in settings are per frame at FPS, the simulation works in units per second.
+
+class InputCommand:
+    def __init__(self, rotate=0):
+        self.rotate = rotate  # -1 turns left, 1 turns right
+
+class PlayerState:
+    def __init__(self, player_id, x, y, angle):
+        self.id = player_id
+        self.x = x
+        self.y = y
+        self.angle = angle
+
+    def rect(self):
+        return (self.x - PLAYER_WIDTH / 2, self.y - PLAYER_HEIGHT / 2, PLAYER_WIDTH, PLAYER_HEIGHT)
+
+    def serialize(self):
+        return {'pos': (self.x, self.y), 'angle': self.angle}
+
+class AsteroidState:
+    def __init__(self, asteroid_id, x, y, angle):
+        self.id = asteroid_id
+        self.x = x
+        self.y = y
+        self.angle = angle
+
+    def rect(self):
+        return (self.x - ASTEROID_WIDTH / 2, self.y - ASTEROID_HEIGHT / 2, ASTEROID_WIDTH, ASTEROID_HEIGHT)
+
+    def serialize(self):
+        return {'pos': (self.x, self.y), 'angle': self.angle}
+
+def rects_overlap(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+def move_player(player, command, dt, width, height, speed=PLAYER_SPEED, rotate_speed=PLAYER_ROTATE_SPEED):
+    player.angle += command.rotate * rotate_speed * FPS * dt
+    player.angle %= 360
+    radians = math.radians(player.angle)
+    dx, dy = math.cos(radians), math.sin(radians)
+    player.x += dx * speed * FPS * dt
+    player.y += dy * speed * FPS * dt
+
+    # Bounce off the edges of the game space
+    bounced = False
+    if player.x <= 10 or player.x >= width - 10:
+        player.x = min(max(player.x, 10), width - 10)
+        dx *= -1
+        bounced = True
+    if player.y <= 10 or player.y >= height - 10:
+        player.y = min(max(player.y, 10), height - 10)
+        dy *= -1
+        bounced = True
+    if bounced:
+        player.angle = math.degrees(math.atan2(dy, dx))
+
+class World:
+    def __init__(self, width=GAME_WIDTH, height=GAME_HEIGHT, seed=None, speed=PLAYER_SPEED, rotate_speed=PLAYER_ROTATE_SPEED):
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.rotate_speed = rotate_speed
+        self.random = random.Random(seed)
+        self.players = {}
+        self.asteroids = {}
+        self.scores = {}
+        self.asteroid_grid = SpatialHash(SPATIAL_CELL_SIZE)
+        self.last_asteroid_id = 0
+        self.time = 0.0
+
+    def spawn_asteroids(self, count):
+        for _ in range(count):
+            self.last_asteroid_id += 1
+            asteroid = AsteroidState(self.last_asteroid_id, self.random.randint(10, self.width - 10),
+                                     self.random.randint(10, self.height - 10), self.random.choice([0, 90, 180, 270]))
+            self.asteroids[asteroid.id] = asteroid
+            self.asteroid_grid.insert(asteroid.id, asteroid.rect())
+
+    def clear_asteroids(self):
+        self.asteroids = {}
+        self.asteroid_grid.clear()
+
+    def remove_asteroid(self, asteroid_id):
+        self.asteroid_grid.remove(asteroid_id)
+        return self.asteroids.pop(asteroid_id)
+
+    def add_player(self, player_id, pos=None, angle=None):
+        x, y = pos if pos is not None else (self.width // 2, self.height // 2)
+        angle = angle if angle is not None else self.random.uniform(0, 360)
+        player = self.players[player_id] = PlayerState(player_id, x, y, angle)
+        self.scores[player_id] = 0
+        return player
+
+    def remove_player(self, player_id):
+        self.scores.pop(player_id, None)
+        return self.players.pop(player_id, None)
+
+    def set_player(self, player_id, pos, angle):
+        player = self.players[player_id]
+        player.x, player.y = pos
+        player.angle = angle
+
+    def collect(self, player):
+        # Removes every asteroid the player overlaps and returns their ids
+        rect = player.rect()
+        hits = [asteroid_id for asteroid_id in self.asteroid_grid.query(rect) if rects_overlap(rect, self.asteroids[asteroid_id].rect())]
+        for asteroid_id in hits:
+            self.remove_asteroid(asteroid_id)
+        self.scores[player.id] += len(hits)
+        return hits
+
+    def pickup(self, player_ids):
+        # Collects whatever the players overlap where they stand, for positions set from outside with set_player
+        return [(player_id, asteroid_id) for player_id in player_ids if player_id in self.players
+                for asteroid_id in self.collect(self.players[player_id])]
+
+    def step(self, dt, commands=None):
+        # Advances every commanded player by dt seconds, returns the (player id, asteroid id) pickups
+        commands = commands or {}
+        pickups = []
+        for player_id, command in commands.items():
+            player = self.players.get(player_id)
+            if player is None:
+                continue
+            move_player(player, command, dt, self.width, self.height, self.speed, self.rotate_speed)
+            pickups.extend((player_id, asteroid_id) for asteroid_id in self.collect(player))
+        self.time += dt
+        return pickups
+
+    def to_state(self):
+        return {
+            'players': {player_id: player.serialize() for player_id, player in self.players.items()},
+            'asteroids': {asteroid_id: asteroid.serialize() for asteroid_id, asteroid in self.asteroids.items()},
+            'scores': dict(self.scores),
+        }
\ No newline at end of file
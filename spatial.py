@@ -0,0 +1,59 @@
+class SpatialHash:
+    # Uniform grid over world space, items are indexed under every cell their rect overlaps
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}  # (column, row) -> set of items
+        self.item_bounds = {}  # item -> cell range it is stored under
+
+    def __len__(self):
+        return len(self.item_bounds)
+
+    def __contains__(self, item):
+        return item in self.item_bounds
+
+    def cell_range(self, rect):
+        x, y, width, height = rect
+        size = self.cell_size
+        return int(x // size), int(y // size), int((x + width) // size), int((y + height) // size)
+
+    @staticmethod
+    def iter_cells(bounds):
+        left, top, right, bottom = bounds
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                yield column, row
+
+    def insert(self, item, rect):
+        bounds = self.cell_range(rect)
+        self.item_bounds[item] = bounds
+        for cell in self.iter_cells(bounds):
+            self.cells.setdefault(cell, set()).add(item)
+
+    def remove(self, item):
+        bounds = self.item_bounds.pop(item, None)
+        if bounds is None:
+            return
+        for cell in self.iter_cells(bounds):
+            items = self.cells[cell]
+            items.discard(item)
+            if not items:
+                del self.cells[cell]
+
+    def move(self, item, rect):
+        # Cheap when the item stays within the same cells, which is almost every frame
+        if self.item_bounds.get(item) == self.cell_range(rect):
+            return
+        self.remove(item)
+        self.insert(item, rect)
+
+    def query(self, rect):
+        found = set()
+        for cell in self.iter_cells(self.cell_range(rect)):
+            items = self.cells.get(cell)
+            if items:
+                found |= items
+        return found
+
+    def clear(self):
+        self.cells.clear()
+        self.item_bounds.clear()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import time
+
+# Startup phase timing for --profile-startup, shared by the client and the server so it imports nothing heavy.
+# The clock starts when this module is first imported, which entry points do before their other imports.
+
+STARTED = time.perf_counter()
+
+class StartupTimer:
+    def __init__(self, start=STARTED):
+        self.start = start
+        self.last = start
+        self.phases = []  # (name, seconds since the previous mark)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.start
+
+    def report(self, path='-'):
+        # A table on stdout, or JSON for a path so benchmarks can track it
+        if path == '-':
+            print("Startup phases:")
+            for name, seconds in self.phases:
+                print(f"  {name:<14}{seconds * 1000:>8.1f} ms")
+            print(f"  {'total':<14}{self.total() * 1000:>8.1f} ms")
+            return
+        import json
+        import os
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'phases_ms': {name: seconds * 1000 for name, seconds in self.phases}, 'total_ms': self.total() * 1000}, f)
+        os.replace(path + '.tmp', path)  # Appears complete to anything waiting for it
@@ -0,0 +1,54 @@
+import pygame
+from enums import Colour
+from settings import TRAIL_LENGTH, TRAIL_MIN_RADIUS, TRAIL_MAX_RADIUS
+
+# Exhaust trails. Positions go into a fixed ring buffer and every segment is drawn with a circle sprite from a shared
+# table, so drawing a trail allocates no surfaces however many players or segments there are.
+
+_circles = {}  # (radius, alpha) -> pre-rendered circle
+_tables = {}  # Segment count -> [(sprite, radius)] from the oldest segment to the newest
+
+def circle_sprite(radius, alpha):
+    key = (radius, alpha)
+    sprite = _circles.get(key)
+    if sprite is None:
+        sprite = _circles[key] = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, (*Colour.ORANGE, alpha), (radius, radius), radius)
+    return sprite
+
+def segment_table(count):
+    # Tapering and fading towards the oldest segment, a short trail fades over its own length
+    table = _tables.get(count)
+    if table is None:
+        table = _tables[count] = []
+        for i in range(count):
+            radius = int(TRAIL_MIN_RADIUS + (TRAIL_MAX_RADIUS - TRAIL_MIN_RADIUS) * (i / count))
+            table.append((circle_sprite(radius, int(255 * (i / count))), radius))
+    return table
+
+class Trail:
+    def __init__(self, length=TRAIL_LENGTH):
+        self.length = length
+        self.x = [0.0] * length
+        self.y = [0.0] * length
+        self.head = 0  # Slot the next position is written to, the oldest one once the buffer is full
+        self.count = 0
+
+    def add(self, x, y):
+        self.x[self.head] = x
+        self.y[self.head] = y
+        self.head = (self.head + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+
+    def clear(self):
+        self.head = self.count = 0
+
+    def draw(self, surface, camera_offset):
+        count = self.count
+        if not count:
+            return
+        start = (self.head - count) % self.length
+        offset_x, offset_y = camera_offset.x, camera_offset.y
+        xs, ys, length = self.x, self.y, self.length
+        surface.blits([(sprite, (xs[(start + i) % length] - radius - offset_x, ys[(start + i) % length] - radius - offset_y))
+                       for i, (sprite, radius) in enumerate(segment_table(count))], False)
@@ -1,75 +1,70 @@
 import pygame
+from collections import OrderedDict
 from enums import Colour, GameState
-from settings import WIDTH, HEIGHT
-
-def display_main_menu(window, large_font, font, background, camera_offset):
-    window.blit(background, -camera_offset)
-    title_text = large_font.render("Space Miner", True, Colour.WHITE)
-    title_rect = title_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 100))
-    window.blit(title_text, title_rect)
-
-    single_player_text = font.render("1. Single Player", True, Colour.WHITE)
-    single_player_rect = single_player_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 20))
-    window.blit(single_player_text, single_player_rect)
-
-    multiplayer_text = font.render("2. Multiplayer", True, Colour.WHITE)
-    multiplayer_rect = multiplayer_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 20))
-    window.blit(multiplayer_text, multiplayer_rect)
-
-    options_text = font.render("3. Options", True, Colour.WHITE)
-    options_rect = options_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 60))
-    window.blit(options_text, options_rect)
-
-    exit_text = font.render("4. Exit", True, Colour.WHITE)
-    exit_rect = exit_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 100))
-    window.blit(exit_text, exit_rect)
-
-    pygame.display.flip()
-
-def display_pause_menu(window, large_font, font, background, camera_offset):
-    window.blit(background, -camera_offset)
-    pause_text = large_font.render("Paused", True, Colour.WHITE)
-    pause_rect = pause_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 100))
-    window.blit(pause_text, pause_rect)
-
-    resume_text = font.render("Press P to resume", True, Colour.WHITE)
-    resume_rect = resume_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 20))
-    window.blit(resume_text, resume_rect)
-
-    reset_text = font.render("Press R to reset", True, Colour.WHITE)
-    reset_rect = reset_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 20))
-    window.blit(reset_text, reset_rect)
-
-    main_menu_text = font.render("Press M for Main Menu", True, Colour.WHITE)
-    main_menu_rect = main_menu_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 60))
-    window.blit(main_menu_text, main_menu_rect)
-
-    quit_text = font.render("Press ESC to quit", True, Colour.WHITE)
-    quit_rect = quit_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 100))
-    window.blit(quit_text, quit_rect)
-
-    pygame.display.flip()
-
-def display_end_screen(window, large_font, font, game_state, background, camera_offset):
-    window.blit(background, -camera_offset)
-    if game_state == GameState.WON:
-        message_text = large_font.render("You won!", True, Colour.GREEN)
+from settings import WIDTH, HEIGHT, TEXT_CACHE_SIZE
+
+_text_cache = OrderedDict()  # (font, text, colour) -> rendered surface, least recently used first
+_screens = {}  # Screen name -> (key, composed surface), menus only change when the camera or fonts do
+
+def render_text(font, text, colour):
+    key = (font, text, colour)
+    surface = _text_cache.get(key)
+    if surface is None:
+        surface = _text_cache[key] = font.render(text, True, colour)
+        if len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
     else:
-        message_text = large_font.render("Game over!", True, Colour.RED)
-
-    message_rect = message_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-    window.blit(message_text, message_rect)
+        _text_cache.move_to_end(key)
+    return surface
+
+def blit_centered(surface, text, y_offset):
+    surface.blit(text, text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + y_offset)))
+
+def draw_screen(window, name, key, compose):
+    # Static screens are composed into one surface the first time they are shown, then drawn with a single blit.
+    # Nothing here flips the display, main.py does that once per frame.
+    cached = _screens.get(name)
+    if cached is None or cached[0] != key:
+        surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+        compose(surface)
+        cached = _screens[name] = (key, surface)
+    window.blit(cached[1], (0, 0))
+    return cached[1]
 
-    reset_text = font.render("Press R to restart", True, Colour.WHITE)
-    reset_rect = reset_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
-    window.blit(reset_text, reset_rect)
-
-    main_menu_text = font.render("Press M for Main Menu", True, Colour.WHITE)
-    main_menu_rect = main_menu_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 100))
-    window.blit(main_menu_text, main_menu_rect)
-
-    quit_text = font.render("Press ESC to quit", True, Colour.WHITE)
-    quit_rect = quit_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 150))
-    window.blit(quit_text, quit_rect)
-
-    pygame.display.flip()
\ No newline at end of file
+def display_main_menu(window, large_font, font, background, camera_offset):
+    def compose(surface):
+        background.draw(surface, camera_offset)
+        blit_centered(surface, render_text(large_font, "Space Miner", Colour.WHITE), -100)
+        blit_centered(surface, render_text(font, "1. Single Player", Colour.WHITE), -20)
+        blit_centered(surface, render_text(font, "2. Multiplayer", Colour.WHITE), 20)
+        blit_centered(surface, render_text(font, "3. Options", Colour.WHITE), 60)
+        blit_centered(surface, render_text(font, "4. Exit", Colour.WHITE), 100)
+
+    return draw_screen(window, 'main_menu', (large_font, font, background, tuple(camera_offset)), compose)
+
+def display_pause_menu(window, large_font, font, background, camera_offset, restart=True):
+    def compose(surface):
+        background.draw(surface, camera_offset)
+        blit_centered(surface, render_text(large_font, "Paused", Colour.WHITE), -100)
+        blit_centered(surface, render_text(font, "Press P to resume", Colour.WHITE), -20)
+        if restart:  # Not in multiplayer, where the server runs the match
+            blit_centered(surface, render_text(font, "Press R to reset", Colour.WHITE), 20)
+        blit_centered(surface, render_text(font, "Press M for Main Menu", Colour.WHITE), 60)
+        blit_centered(surface, render_text(font, "Press ESC to quit", Colour.WHITE), 100)
+
+    return draw_screen(window, 'pause_menu', (large_font, font, background, tuple(camera_offset), restart), compose)
+
+def display_end_screen(window, large_font, font, game_state, background, camera_offset, restart=True):
+    def compose(surface):
+        background.draw(surface, camera_offset)
+        if game_state == GameState.WON:
+            message_text = render_text(large_font, "You won!", Colour.GREEN)
+        else:
+            message_text = render_text(large_font, "Game over!", Colour.RED)
+        blit_centered(surface, message_text, 0)
+        if restart:  # In multiplayer the server starts the next match on its own
+            blit_centered(surface, render_text(font, "Press R to restart", Colour.WHITE), 50)
+        blit_centered(surface, render_text(font, "Press M for Main Menu", Colour.WHITE), 100)
+        blit_centered(surface, render_text(font, "Press ESC to quit", Colour.WHITE), 150)
+
+    return draw_screen(window, 'end_screen', (large_font, font, game_state, background, tuple(camera_offset), restart), compose)